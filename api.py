@@ -0,0 +1,217 @@
+"""ASGI-сервис прогноза без фреймворков: процесс api из Procfile (воркеры uvicorn под gunicorn), интерфейс — процесс web.
+
+    GET  /health             — проверка живости
+    POST /forecast           — один сценарий (JSON-объект) -> JSON с результатом
+    POST /forecast/batch     — JSON-массив или JSONL со сценариями -> поток JSONL с результатами
+
+Локально: uvicorn api:app --port 8000
+"""
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from forecast import K, MARKETING_EFFECTIVENESS, OPTIONAL_FIELDS, REQUIRED_FIELDS, RESULT_FIELDS, forecast_records
+from shared_cache import cache_key, shared_cache
+
+BATCH_CHUNK_SIZE = int(os.environ.get('FFP_API_CHUNK_SIZE', 5000))
+MAX_BODY_BYTES = int(os.environ.get('FFP_API_MAX_BODY_BYTES', 64 * 1024 * 1024))
+WORKER_THREADS = int(os.environ.get('FFP_API_THREADS', 4))
+# Векторный расчёт стоит ~5 мкс на сценарий плюс ~0.7 мс на вызов, поиск в общем кэше — ~20 мкс на
+# сценарий: кэш выгоден для одиночных запросов и маленьких пачек, большие пачки быстрее посчитать заново
+SHARED_CACHE_MAX_ROWS = int(os.environ.get('FFP_API_SHARED_CACHE_MAX_ROWS', 32))
+
+_executor = None
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='forecast')
+    return _executor
+
+
+async def _run_blocking(function, *args):
+    # numpy-расчёт уходит в пул потоков, чтобы не блокировать цикл событий между запросами
+    return await asyncio.get_running_loop().run_in_executor(_get_executor(), function, *args)
+
+
+def _scenario_key(scenario):
+    # Ключ по значимым полям, приведённым к числу, как их читает forecast_records; лишние поля не влияют.
+    # Сценарий, который не приводится, ключа не получает и считается напрямую — там же и вернётся ошибка.
+    inputs = {'k': K, 'marketing_effectiveness': MARKETING_EFFECTIVENESS}
+    try:
+        for field in REQUIRED_FIELDS + tuple(OPTIONAL_FIELDS):
+            value = scenario.get(field)
+            if value in (None, ''):
+                if field in REQUIRED_FIELDS:
+                    return None
+                # NaN по умолчанию у fame_factor — «рассчитать по бюджету»
+                value = OPTIONAL_FIELDS[field]
+                inputs[field] = None if value != value else value
+                continue
+            value = float(value)
+            # Явный NaN или бесконечность не должны совпасть с ключом значения по умолчанию
+            if not math.isfinite(value):
+                return None
+            inputs[field] = value
+    except (TypeError, ValueError):
+        return None
+    return cache_key('forecast', inputs)
+
+
+def _forecast_chunk(scenarios):
+    if len(scenarios) > SHARED_CACHE_MAX_ROWS:
+        computed = forecast_records(scenarios)
+        return [{field: computed[field][i] for field in RESULT_FIELDS} for i in range(len(scenarios))]
+    # Результаты общие для всех воркеров и переживают перезапуск: считаются только сценарии, которых нет в кэше
+    cache = shared_cache()
+    keys = [_scenario_key(scenario) for scenario in scenarios]
+    found = cache.get_many([key for key in keys if key is not None])
+    results = [found.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        computed = forecast_records([scenarios[i] for i in missing])
+        for j, i in enumerate(missing):
+            results[i] = {field: computed[field][j] for field in RESULT_FIELDS}
+        cache.put_many('forecast', {keys[i]: results[i] for i in missing if keys[i] is not None})
+    return results
+
+
+def _check_scenario(scenario):
+    # Поля прогноза — числа (или строки с числом): вложенный объект или массив отклоняем до расчёта
+    if not isinstance(scenario, dict):
+        raise HTTPError(400, "expected a scenario object")
+    for field in REQUIRED_FIELDS + tuple(OPTIONAL_FIELDS):
+        if isinstance(scenario.get(field), (dict, list)):
+            raise HTTPError(400, f"scenario field {field!r} must be a number, got {scenario[field]!r}")
+    return scenario
+
+
+def _parse_scenarios(body, content_type):
+    try:
+        if content_type.startswith(('application/x-ndjson', 'application/jsonl')):
+            scenarios = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            scenarios = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPError(400, f"invalid JSON: {e}")
+    if isinstance(scenarios, dict):
+        scenarios = scenarios.get('scenarios')
+    if not isinstance(scenarios, list) or not all(isinstance(scenario, dict) for scenario in scenarios):
+        raise HTTPError(400, "expected a list of scenario objects")
+    for scenario in scenarios:
+        _check_scenario(scenario)
+    return scenarios
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HTTPError(400, "client disconnected")
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise HTTPError(413, "request body too large")
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _forecast(receive, send, headers):
+    body = await _read_body(receive)
+    try:
+        scenario = json.loads(body)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise HTTPError(400, f"invalid JSON: {e}")
+    _check_scenario(scenario)
+    try:
+        [result] = await _run_blocking(_forecast_chunk, [scenario])
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+    await _send_json(send, 200, result)
+
+
+async def _forecast_batch(receive, send, headers):
+    scenarios = _parse_scenarios(await _read_body(receive), headers.get(b'content-type', b'').decode('latin-1'))
+    chunks = [scenarios[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(scenarios), BATCH_CHUNK_SIZE)]
+    # Первый чанк считаем до отправки заголовков, чтобы ошибка в данных вернулась как 400
+    try:
+        results = await _run_blocking(_forecast_chunk, chunks[0]) if chunks else []
+    except ValueError as e:
+        raise HTTPError(400, str(e))
+
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson')]})
+    for i in range(1, len(chunks) + 1):
+        # Следующий чанк считается в пуле, пока текущий отправляется клиенту
+        pending = asyncio.ensure_future(_run_blocking(_forecast_chunk, chunks[i])) if i < len(chunks) else None
+        body = ''.join(json.dumps(result, allow_nan=False) + '\n' for result in results).encode('utf-8')
+        await send({'type': 'http.response.body', 'body': body, 'more_body': pending is not None})
+        if pending is None:
+            return
+        try:
+            results = await pending
+        except ValueError as e:
+            # Статус уже отправлен: сообщаем об ошибке последней строкой потока
+            await send({'type': 'http.response.body', 'body': json.dumps({'error': str(e)}).encode('utf-8') + b'\n'})
+            return
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def _health(receive, send, headers):
+    await _send_json(send, 200, {'status': 'ok'})
+
+
+ROUTES = {
+    ('GET', '/health'): _health,
+    ('POST', '/forecast'): _forecast,
+    ('POST', '/forecast/batch'): _forecast_batch,
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            _get_executor()
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+
+    handler = ROUTES.get((scope['method'], scope['path']))
+    try:
+        if handler is None:
+            allowed = any(path == scope['path'] for _, path in ROUTES)
+            raise HTTPError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+        await handler(receive, send, dict(scope['headers']))
+    except HTTPError as e:
+        await _send_json(send, e.status, {'error': e.message})
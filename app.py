@@ -1,17 +1,33 @@
 import streamlit as st
-import plotly.graph_objects as go
-import pandas as pd
+import functools
+import os
 import re
-import math
-
-st.set_page_config(page_title="Прогноз на мероприятие", layout="wide", initial_sidebar_state="collapsed")
+from datetime import date, datetime, timedelta
+
+from calibration import calibrate
+from charts import (LABEL_THRESHOLD, build_comparison_figure, build_histogram_figure, build_presale_figure,
+                    build_price_surface_figure, build_queue_figure, build_scenario_figure, build_tornado_figure,
+                    sensitivity_label)
+from door_queue import simulate_door_queue
+from event_store import PRE_SALE_FIELDS, new_catalog, query_event_names, refresh_catalog
+from forecast import K, MARKETING_EFFECTIVENESS, comparison_points, stage_tiers
+from live_sales import LiveDemand, SalesLog
+from metric_graph import FORECAST_METRICS, equilibrium, forecast_graph
+from optimizer import optimize_prices
+from portfolio import allocate_marketing
+from presale import PresaleTimeline
+from profiling import Profiler, profile_mode
+from result_store import info as result_file_info, read as read_result_file, summarize as summarize_result_file
+from sensitivity import sensitivity_analysis
+from shared_cache import shared_cache
+from simulation import run_monte_carlo
+from versions import VersionStore
+from workspace import ScenarioWorkspace
 
 def get_next_version(base_name, existing_events, versions):
+    # Настройки из каталога — версия 1, поэтому первая правка мероприятия показывается как V2
     if base_name in existing_events and base_name != 'Hardline I':
-        version = 2
-        while f"{base_name} V{version}" in versions:
-            version += 1
-        return f"{base_name} V{version}"
+        return f"{base_name} V{max(2, versions.next_version(base_name))}"
     return base_name
 
 def generate_color(base_name):
@@ -32,103 +48,692 @@ def generate_color(base_name):
         return f'#{r:02x}{g:02x}{b:02x}'
     return base_color
 
-def calculate_guests_and_price(stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
-                               door_price, door_limit, marketing_guests, free_tickets, fame_factor, max_iterations=2):
-    total_tickets_available = stage1_limit + stage2_limit + stage3_limit + door_limit
-    if total_tickets_available == 0:
-        return 0, {'stage1': 0, 'stage2': 0, 'stage3': 0, 'door': 0}, 0, 0
-
-    w1 = stage1_limit / total_tickets_available if total_tickets_available > 0 else 0
-    w2 = stage2_limit / total_tickets_available if total_tickets_available > 0 else 0
-    w3 = stage3_limit / total_tickets_available if total_tickets_available > 0 else 0
-    w4 = door_limit / total_tickets_available if total_tickets_available > 0 else 0
-
-    k = 0.0038
-    estimated_guests = 0
-    avg_ticket_price = 0
-    for _ in range(max_iterations):
-        weighted_price = w1 * stage1_price + w2 * stage2_price + w3 * stage3_price + w4 * door_price
-        price_factor = math.exp(-k * weighted_price)
-        estimated_guests = min(total_tickets_available, max(0, round(marketing_guests * price_factor)))
-
-        ticket_sales = {
-            'stage1': min(estimated_guests, stage1_limit) if estimated_guests > 0 else 0,
-            'stage2': min(max(0, estimated_guests - stage1_limit), stage2_limit) if estimated_guests > stage1_limit else 0,
-            'stage3': min(max(0, estimated_guests - stage1_limit - stage2_limit), stage3_limit) if estimated_guests > stage1_limit + stage2_limit else 0,
-            'door': min(max(0, estimated_guests - stage1_limit - stage2_limit - stage3_limit), door_limit) if door_limit > 0 else max(0, estimated_guests - stage1_limit - stage2_limit - stage3_limit)
+CACHE_MAX_ENTRIES = 256
+CACHE_TTL = 3600
+LIVE_SALES_REFRESH = 5
+# Замер этапов перезапуска: FFP_PROFILE=1 или ?profile=1 в адресе, cProfile — значение cprofile
+PROFILE_MODE = os.environ.get('FFP_PROFILE')
+PROFILE_LOG = os.environ.get('FFP_PROFILE_LOG')
+EVENT_SUMMARY_FIELDS = ('budget', 'guests', 'ticket_price', 'marketing_percent', 'fame_factor', 'risk_amount', 'free_tickets')
+
+@st.cache_resource
+def cache_stats():
+    return {'forecast': {'hits': 0, 'misses': 0}, 'figure': {'hits': 0, 'misses': 0}}
+
+def _counted(name, cached_function, *args):
+    # Тело кэшируемой функции выполняется только при промахе и само увеличивает misses
+    stats = cache_stats()[name]
+    misses = stats['misses']
+    result = cached_function(*args)
+    if stats['misses'] == misses:
+        stats['hits'] += 1
+    return result
+
+def rerun_profiler():
+    if 'profiler' not in st.session_state:
+        st.session_state.profiler = Profiler(log_path=PROFILE_LOG)
+    return st.session_state.profiler
+
+def span(name):
+    return rerun_profiler().span(name)
+
+def profiled(name):
+    # Для фрагментов: при перезапуске одного фрагмента его замер становится отдельным перезапуском
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def begin_rerun_profile():
+    try:
+        mode = profile_mode(st.query_params.get('profile', PROFILE_MODE))
+    except ValueError as e:
+        st.sidebar.warning(f"Профилирование выключено: {e}")
+        mode = None
+    rerun_profiler().begin("Страница", mode)
+
+def show_profile_panel():
+    profiler = rerun_profiler()
+    run = profiler.end()
+    if not profiler.enabled:
+        return
+    with st.sidebar.expander("Debug: профиль", expanded=True):
+        st.text(f"Перезапуск: {run['total_ms']:,.1f} мс")
+        st.dataframe(
+            [{"Этап": "· " * item['depth'] + item['name'], "мс": round(item['ms'], 2),
+              "Доля": f"{item['ms'] / run['total_ms']:.0%}" if run['total_ms'] else ""} for item in run['spans']],
+            hide_index=True, width='stretch'
+        )
+        if run['functions']:
+            st.dataframe(
+                [{"Функция": item['function'], "Вызовов": item['calls'], "Своё, мс": round(item['tottime_ms'], 2),
+                  "Всего, мс": round(item['cumtime_ms'], 2)} for item in run['functions']],
+                hide_index=True, width='stretch'
+            )
+        # Перезапуски отдельных фрагментов попадают в историю и видны после следующего полного перезапуска
+        st.dataframe(
+            [{"Начало": item['started'], "Что": item['label'], "мс": round(item['total_ms'], 1)}
+             for item in reversed(profiler.runs)],
+            hide_index=True, width='stretch'
+        )
+        st.download_button("Скачать JSON", profiler.to_json(), file_name="profile.json", mime="application/json",
+                           key="profile_export", on_click="ignore")
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def _equilibrium(tier_items, marketing_guests, k):
+    cache_stats()['forecast']['misses'] += 1
+    return equilibrium(tier_items, marketing_guests, k)
+
+def cached_equilibrium(tier_items, marketing_guests, k):
+    # Граф помнит только последнее значение, а этот кэш — ограниченное число решений для всех сессий:
+    # возврат к прежним настройкам (A -> B -> A) не запускает решатель заново
+    return _counted('forecast', _equilibrium, tier_items, marketing_guests, k)
+
+def event_forecast(event_name, budget, marketing_percentage, risk_amount, free_tickets, tiers, fame_factor, model):
+    # У каждого мероприятия свой граф метрик: пересчитываются только узлы ниже изменившихся входов
+    graph = st.session_state.metric_graphs.get(event_name)
+    if graph is None:
+        graph = st.session_state.metric_graphs[event_name] = forecast_graph(cached_equilibrium)
+    graph.update(
+        budget=budget, marketing_percent=marketing_percentage, risk_amount=risk_amount, free_tickets=free_tickets,
+        tier_items=tuple((tier['price'], tier['limit']) for tier in tiers), fame_override=fame_factor,
+        k=model['k'], marketing_effectiveness=model['marketing_effectiveness']
+    )
+    return graph.evaluate(FORECAST_METRICS)
+
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def _comparison_figure(points, selected, highlight):
+    cache_stats()['figure']['misses'] += 1
+    return build_comparison_figure(points, selected, highlight)
+
+def cached_comparison_figure(points, selected, highlight):
+    return _counted('figure', _comparison_figure, points, selected, highlight)
+
+def show_cache_debug_panel():
+    with st.sidebar.expander("Debug: кэш"):
+        for name, stats in cache_stats().items():
+            st.text(f"{name}: hits {stats['hits']}, misses {stats['misses']}")
+        shared = shared_cache().stats()
+        st.text(f"общий: hits {shared['hits']}, misses {shared['misses']}, записей {shared['entries']:,d}, "
+                f"{shared['bytes'] / 2 ** 20:.1f} из {shared['max_bytes'] / 2 ** 20:.0f} МБ")
+        if st.button("Сбросить кэш", key="clear_cache"):
+            _equilibrium.clear()
+            _comparison_figure.clear()
+
+def show_metric_graph_panel(event_name):
+    graph = st.session_state.metric_graphs.get(event_name)
+    if graph is None:
+        return
+    with st.sidebar.expander("Debug: граф метрик"):
+        st.dataframe(
+            [{"Узел": name, "Пересчитан": timing['recomputed'], "Последний, мс": timing['last_ms'],
+              "Вызовов": timing['calls'], "Всего, мс": timing['total_ms']} for name, timing in graph.timings.items()],
+            hide_index=True, width='stretch'
+        )
+
+@st.cache_resource
+def event_catalog():
+    return new_catalog()
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner=False)
+def _event_names(last_seq, filter_items):
+    return query_event_names(event_catalog(), **dict(filter_items))
+
+def load_events(filters):
+    catalog = event_catalog()
+    records = refresh_catalog(catalog)
+    names = _event_names(catalog['last_seq'], tuple(sorted(filters.items())))
+    events = {name: {field: records[name][field] for field in EVENT_SUMMARY_FIELDS} for name in names}
+    pre_sales = {
+        name: stage_tiers(records[name])
+        for name in names if all(records[name][field] is not None for field in PRE_SALE_FIELDS)
+    }
+    return events, pre_sales
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def _calibration(last_seq, fit_fame):
+    # last_seq меняется только при записи в каталог, calibrate дополнительно кэширует результат на диске
+    return calibrate(event_catalog()['events'].values(), fit_fame)
+
+def show_demand_model_panel():
+    model = {'k': K, 'marketing_effectiveness': MARKETING_EFFECTIVENESS, 'fame_factors': {}}
+    with st.sidebar.expander("Модель спроса"):
+        use_calibration = st.checkbox("Калибровать по прошедшим мероприятиям", value=False, key="use_calibration")
+        fit_fame = st.checkbox("Подбирать известность мероприятий", value=False, key="fit_fame", disabled=not use_calibration)
+        if use_calibration:
+            try:
+                calibration = _calibration(event_catalog()['last_seq'], fit_fame)
+            except ValueError as e:
+                st.warning(f"Калибровка невозможна: {e}")
+            else:
+                model.update({key: calibration[key] for key in ('k', 'marketing_effectiveness')})
+                model['fame_factors'] = calibration.get('fame_factors', {})
+                st.caption(f"Мероприятий: {calibration['events']}, RMSE(ln гостей): {calibration['rmse_log']:.3f}")
+        st.text(f"k = {model['k']:.5f}\nЭффективность маркетинга = {model['marketing_effectiveness']:.4f}")
+    return model
+
+def show_catalog_filters():
+    with st.sidebar.expander("Каталог мероприятий"):
+        name = st.text_input("Название содержит:", key="catalog_name")
+        col_from, col_to = st.columns(2)
+        date_from = col_from.date_input("С:", value=None, key="catalog_date_from")
+        date_to = col_to.date_input("По:", value=None, key="catalog_date_to")
+        budget_min = col_from.number_input("Бюджет от (₽):", 0, value=None, step=10000, key="catalog_budget_min")
+        budget_max = col_to.number_input("Бюджет до (₽):", 0, value=None, step=10000, key="catalog_budget_max")
+    return {
+        'name': name or None,
+        'date_from': date_from.isoformat() if date_from else None,
+        'date_to': date_to.isoformat() if date_to else None,
+        'budget_min': budget_min,
+        'budget_max': budget_max,
+    }
+
+def reset_tier_editor(event_name, tiers):
+    # Правки data_editor хранятся как разница с переданной таблицей, поэтому новые значения
+    # становятся новой исходной таблицей, а состояние виджета сбрасывается
+    st.session_state.tier_editor_base[event_name] = [dict(tier) for tier in tiers]
+    st.session_state.pop(f"tiers_{event_name}", None)
+
+def apply_optimized_prices(event_name, budget, marketing_percentage, limits, free_tickets, risk_amount, fame_factor,
+                           objective, monotonic, model):
+    # Подбор цен — самый долгий расчёт: результат берётся из общего кэша, если его уже считал любой воркер
+    inputs = {'budget': budget, 'marketing_percent': marketing_percentage, 'limits': list(limits),
+              'free_tickets': free_tickets, 'risk_amount': risk_amount, 'fame_factor': fame_factor,
+              'objective': objective, 'monotonic': monotonic,
+              'k': model['k'], 'marketing_effectiveness': model['marketing_effectiveness']}
+    result = shared_cache().get_or_compute('optimize_prices', inputs, lambda: optimize_prices(
+        budget, marketing_percentage, limits, free_tickets, risk_amount, fame_factor,
+        objective=objective, monotonic=monotonic, k=model['k'], marketing_effectiveness=model['marketing_effectiveness']
+    ))
+    tiers = [dict(tier, price=price) for tier, price in zip(st.session_state.pre_sale_values[event_name], result['prices'])]
+    st.session_state.pre_sale_values[event_name] = tiers
+    reset_tier_editor(event_name, tiers)
+    st.session_state.optimizer_results[event_name] = result
+
+def edit_tiers(event_name):
+    base = st.session_state.tier_editor_base.setdefault(event_name, [dict(tier) for tier in st.session_state.pre_sale_values[event_name]])
+    edited = st.data_editor(
+        base, key=f"tiers_{event_name}", num_rows='dynamic', hide_index=True, width='stretch',
+        column_order=('name', 'price', 'limit'),
+        column_config={
+            'name': st.column_config.TextColumn("Уровень"),
+            'price': st.column_config.NumberColumn("Цена (₽)", min_value=1, step=100, format="%d"),
+            'limit': st.column_config.NumberColumn("Количество", min_value=0, step=1, format="%d"),
         }
-        sold_tickets = sum(ticket_sales.values())
-        ticket_revenue = (ticket_sales['stage1'] * stage1_price +
-                          ticket_sales['stage2'] * stage2_price +
-                          ticket_sales['stage3'] * stage3_price +
-                          ticket_sales['door'] * door_price)
-        avg_ticket_price = ticket_revenue / sold_tickets if sold_tickets > 0 else weighted_price
+    )
+    st.caption("Уровни продаются по порядку, последний — на входе.")
+    tiers = []
+    for row in edited:
+        if row.get('price') is None or row.get('limit') is None:
+            continue
+        tiers.append({'name': row.get('name') or f"Уровень {len(tiers) + 1}", 'price': int(row['price']), 'limit': int(row['limit'])})
+    return tiers
+
+def scenario_rows(workspace):
+    return [{
+        'name': name, 'budget': scenario['budget'], 'marketing': round(scenario['marketing_percent'] * 100),
+        'risk_amount': scenario['risk_amount'], 'free_tickets': scenario['free_tickets'],
+        'prices': ", ".join(str(tier['price']) for tier in scenario['tiers']),
+        'limits': ", ".join(str(tier['limit']) for tier in scenario['tiers']),
+    } for name, scenario in workspace.scenarios.items()]
+
+def reset_workspace_editor():
+    st.session_state.workspace_editor_base = scenario_rows(st.session_state.workspace)
+    st.session_state.pop("workspace_editor", None)
+
+def add_to_workspace(name, scenario):
+    st.session_state.workspace.set(name, scenario)
+    reset_workspace_editor()
+
+def parse_scenario_row(row, previous):
+    prices = [int(value) for value in re.split(r'[,;\s]+', row['prices'] or '') if value]
+    limits = [int(value) for value in re.split(r'[,;\s]+', row['limits'] or '') if value]
+    if not prices or len(prices) != len(limits):
+        raise ValueError("число цен и количеств должно совпадать")
+    names = [tier['name'] for tier in previous['tiers']] if previous and len(previous['tiers']) == len(prices) else \
+        [f"Уровень {i + 1}" for i in range(len(prices))]
+    return {
+        'budget': row['budget'] or 0, 'marketing_percent': (row['marketing'] or 0) / 100,
+        'risk_amount': row['risk_amount'] or 0, 'free_tickets': row['free_tickets'] or 0,
+        'tiers': [{'name': name, 'price': price, 'limit': limit} for name, price, limit in zip(names, prices, limits)],
+        'fame_factor': previous.get('fame_factor') if previous else None,
+    }
+
+@st.fragment
+@profiled("Сравнение сценариев")
+def show_scenario_workspace(current_scenario, default_name, model):
+    workspace = st.session_state.workspace
+    col_name, col_add = st.columns([3, 1])
+    name = col_name.text_input("Название сценария:", value=default_name, key=f"workspace_name_{default_name}")
+    col_add.button("Добавить текущий", key="workspace_add", on_click=add_to_workspace, args=(name, current_scenario),
+                   disabled=not name)
+
+    edited = st.data_editor(
+        st.session_state.workspace_editor_base, key="workspace_editor", num_rows='dynamic', hide_index=True,
+        width='stretch',
+        column_order=('name', 'budget', 'marketing', 'risk_amount', 'free_tickets', 'prices', 'limits'),
+        column_config={
+            'name': st.column_config.TextColumn("Сценарий", required=True),
+            'budget': st.column_config.NumberColumn("Бюджет (₽)", min_value=0, step=1000, format="%d"),
+            'marketing': st.column_config.NumberColumn("Маркетинг (%)", min_value=0, max_value=100, step=5, format="%d"),
+            'risk_amount': st.column_config.NumberColumn("Расходы (₽)", min_value=0, step=5000, format="%d"),
+            'free_tickets': st.column_config.NumberColumn("Free", min_value=0, step=1, format="%d"),
+            'prices': st.column_config.TextColumn("Цены уровней"),
+            'limits': st.column_config.TextColumn("Количество по уровням"),
+        }
+    )
+    # Сценарий пересчитывается, только если его входы изменились: ScenarioWorkspace сравнивает ключи
+    names = set()
+    for row in edited:
+        if not row.get('name'):
+            continue
+        names.add(row['name'])
+        try:
+            workspace.set(row['name'], parse_scenario_row(row, workspace.scenarios.get(row['name'])))
+        except ValueError as e:
+            st.warning(f"{row['name']}: {e}")
+    for removed in set(workspace.scenarios) - names:
+        workspace.remove(removed)
+    if not workspace.scenarios:
+        st.caption("Добавьте сценарии, чтобы сравнить их в одной таблице и на одном графике.")
+        return
+
+    results, recomputed = workspace.results(model['k'], model['marketing_effectiveness'])
+    st.dataframe(
+        [{"Сценарий": name, "Гости": result['total_attendance'], "Средняя цена, ₽": result['avg_ticket_price'],
+          "Выручка от билетов, ₽": result['ticket_revenue'], "Прибыль, ₽": result['profit'],
+          "Чистая прибыль, ₽": result['net_profit'], "Продажи по уровням": " / ".join(map(str, result['tier_sales']))}
+         for name, result in results.items()],
+        hide_index=True, width='stretch'
+    )
+    st.plotly_chart(build_scenario_figure(results), width='stretch')
+    st.caption(f"Пересчитано сценариев: {len(recomputed)} из {len(results)}")
+
+def event_fame_factor(event_name, events, model):
+    # Известность прошедшего мероприятия — откалиброванная или из каталога; у нового выводится из маркетинга (None)
+    if event_name not in events:
+        return None
+    return model['fame_factors'].get(event_name, events[event_name]['fame_factor'])
+
+@st.fragment
+@profiled("Маркетинг на сезон")
+def show_portfolio_allocator(event_names, events, model):
+    state = st.session_state
+    season = [{
+        'name': name, 'budget': state.budget_values[name], 'risk_amount': state.risk_values[name],
+        'free_tickets': state.free_tickets[name], 'tiers': state.pre_sale_values[name],
+        'fame_factor': event_fame_factor(name, events, model),
+    } for name in event_names]
+    current = {event['name']: event['budget'] * state.marketing_values[event['name']] / 100 for event in season}
+    col_total, col_step = st.columns(2)
+    total_marketing = col_total.number_input("Маркетинг на сезон (₽):", 0, value=int(sum(current.values())), step=10000,
+                                             key="portfolio_total")
+    step = col_step.number_input("Шаг (₽):", 100, value=1000, step=100, key="portfolio_step")
+    if st.button("Распределить", key="portfolio_allocate"):
+        state.portfolio_result = allocate_marketing(season, total_marketing, step,
+                                                    model['k'], model['marketing_effectiveness'])
+    result = state.get('portfolio_result')
+    if result:
+        st.dataframe(
+            [{"Мероприятие": name, "Сейчас, ₽": current.get(name), "Предлагается, ₽": spent,
+              "Маркетинг (%)": result['marketing_percent'][name] * 100, "Чистая прибыль, ₽": result['net_profit'][name]}
+             for name, spent in result['allocation'].items()],
+            hide_index=True, width='stretch'
+        )
+        st.caption(f"Потрачено {result['spent']:,d}₽, чистая прибыль сезона {result['total']:,.0f}₽ "
+                   f"(без маркетинга {result['total_without_marketing']:,.0f}₽)")
+
+def event_settings(event_name):
+    state = st.session_state
+    return {
+        'budget': state.budget_values[event_name], 'risk_amount': state.risk_values[event_name],
+        'marketing': state.marketing_values[event_name], 'free_tickets': state.free_tickets[event_name],
+        'tiers': [dict(tier) for tier in state.pre_sale_values[event_name]],
+    }
+
+def save_version(event_name):
+    version, created = st.session_state.versions.commit(event_name, event_settings(event_name))
+    st.session_state.version_message = (
+        f"Сохранено как версия {version}" if created else f"Такие настройки уже сохранены как версия {version}"
+    )
+
+def restore_version(event_name, version):
+    settings = st.session_state.versions.get(event_name, version)
+    state = st.session_state
+    state.budget_values[event_name] = settings['budget']
+    state.risk_values[event_name] = settings['risk_amount']
+    state.marketing_values[event_name] = settings['marketing']
+    state.free_tickets[event_name] = settings['free_tickets']
+    state.pre_sale_values[event_name] = settings['tiers']
+    for key in ('budget', 'risk', 'marketing', 'free'):
+        state.pop(f"{key}_{event_name}", None)
+    reset_tier_editor(event_name, settings['tiers'])
+    state.version_message = f"Восстановлена версия {version}"
+
+@st.fragment
+@profiled("История версий")
+def show_version_history(event_name):
+    versions = st.session_state.versions
+    # Сохранение меняет имя следующей версии, восстановление — настройки: обоим нужен полный перезапуск
+    if st.button("Сохранить версию", key=f"save_version_{event_name}"):
+        save_version(event_name)
+        st.rerun()
+    message = st.session_state.pop('version_message', None)
+    if message:
+        st.caption(message)
+    numbers = versions.versions(event_name)
+    if not numbers:
+        return
+    col_old, col_new, col_restore = st.columns([1, 1, 1])
+    # Число версий в ключе: после сохранения выбор снова указывает на две последние версии
+    old = col_old.selectbox("Версия:", numbers, index=max(0, len(numbers) - 2), key=f"version_old_{event_name}_{len(numbers)}")
+    new = col_new.selectbox("Сравнить с:", numbers, index=len(numbers) - 1, key=f"version_new_{event_name}_{len(numbers)}")
+    if col_restore.button(f"Восстановить версию {old}", key=f"restore_version_{event_name}"):
+        restore_version(event_name, old)
+        st.rerun()
+    changes = versions.diff(event_name, old, new)
+    if changes:
+        st.dataframe([{"Поле": path, f"V{old}": before, f"V{new}": after} for path, before, after in changes],
+                     hide_index=True, width='stretch')
+    else:
+        st.caption("Настройки версий совпадают")
+    st.caption(f"Версий: {len(numbers)}, уникальных снимков во всех мероприятиях: {len(versions)}")
+
+@st.fragment
+@profiled("Сравнительный график")
+def show_comparison_chart(points, highlight):
+    # Фильтр перезапускает только этот фрагмент: точки уже посчитаны, а фигура берётся из кэша.
+    # Варианты — все точки графика, поэтому список растёт вместе с каталогом
+    chart = st.container()
+    names = [point[0] for point in points]
+    if 'chart_events' in st.session_state:
+        # После смены фильтра каталога часть выбранных мероприятий может пропасть из вариантов
+        st.session_state.chart_events = [name for name in st.session_state.chart_events if name in names]
+    selected = st.multiselect("Мероприятия на графике (пусто — все):", names, key="chart_events")
+    with span("Фигура"):
+        fig = cached_comparison_figure(points, tuple(selected) if selected else None, highlight)
+    with span("plotly_chart"):
+        chart.plotly_chart(fig, width='stretch')
+    if len(selected or points) > LABEL_THRESHOLD:
+        st.caption(f"Точек: {len(selected or points):,d} — подписано только текущее мероприятие, "
+                   "остальные видны при наведении")
+
+@st.fragment
+@profiled("Продажи по дням")
+def show_presale_timeline(event_name, estimated_guests, tiers, tier_sales):
+    col_days, col_ramp = st.columns(2)
+    days = col_days.slider("Дней предпродажи", 7, 120, 60, 1, key="presale_days")
+    ramp = col_ramp.slider("Рост спроса к мероприятию", 1.0, 4.0, 2.0, 0.25, key="presale_ramp")
+    timeline_state = st.session_state.presale_timelines.get(event_name)
+    if timeline_state is None or (timeline_state.days, timeline_state.ramp) != (days, ramp):
+        timeline_state = st.session_state.presale_timelines[event_name] = PresaleTimeline(days, ramp)
+    timeline = timeline_state.run(estimated_guests, tiers, tier_sales[-1])
+    st.plotly_chart(build_presale_figure(timeline), width='stretch')
+    sellouts = [
+        f"{name}: {'не распродан' if day is None else f'распродан за {-day} дн.'}"
+        for name, day in zip(timeline['tiers'], timeline['sellout_day'])
+    ]
+    st.caption(" · ".join(sellouts) + f" · до мероприятия собрано {timeline['cash'][-2]:,.0f}₽")
+
+@st.fragment
+@profiled("Живые продажи")
+def show_live_sales(event_name, tiers, marketing_guests, model):
+    path = st.text_input("Журнал продаж (.jsonl или .csv):", key="live_sales_path").strip()
+    col_start, col_event, col_prior = st.columns(3)
+    sales_start = col_start.date_input("Начало продаж", date.today() - timedelta(days=30), key="live_sales_start")
+    event_date = col_event.date_input("Дата мероприятия", date.today() + timedelta(days=30), key="live_sales_event")
+    prior_guests = col_prior.slider("Вес прогноза (гостей)", 1, 500, 50, 1, key="live_sales_prior")
+    if not path:
+        st.caption("Строки журнала: time (ISO 8601 или секунды Unix), tier (название или номер уровня), "
+                   "quantity и price — необязательно.")
+        return
+    show_live_projection(event_name, tiers, marketing_guests, model, path, sales_start, event_date, prior_guests)
+
+@st.fragment(run_every=LIVE_SALES_REFRESH)
+@profiled("Живые продажи: журнал")
+def show_live_projection(event_name, tiers, marketing_guests, model, path, sales_start, event_date, prior_guests):
+    # Вложенный фрагмент есть, только когда задан журнал: он перезапускается каждые LIVE_SALES_REFRESH секунд
+    # и дочитывает новые строки, а без журнала страница ничего не опрашивает
+    ramp = st.session_state.get('presale_ramp', 2.0)
+    key = (path, tuple((tier['name'], tier['price'], tier['limit']) for tier in tiers), marketing_guests,
+           sales_start, event_date, prior_guests, model['k'], ramp)
+    feed = st.session_state.live_sales.get(event_name)
+    if feed is None or feed['key'] != key:
+        try:
+            live = LiveDemand(tiers, marketing_guests, datetime.combine(sales_start, datetime.min.time()),
+                              datetime.combine(event_date, datetime.min.time()), model['k'], ramp, prior_guests)
+        except ValueError as e:
+            st.warning(str(e))
+            return
+        feed = st.session_state.live_sales[event_name] = {'key': key, 'log': SalesLog(path), 'live': live}
+    live, log = feed['live'], feed['log']
+    try:
+        live.ingest(log)
+    except (OSError, UnicodeDecodeError) as e:
+        st.warning(f"Не удалось прочитать журнал: {e}")
+        return
+    live.advance(datetime.now())
+
+    projection = live.projection()
+    theta, guests, revenue = projection['theta'], projection['estimated_guests'], projection['ticket_revenue']
+    col_sold, col_theta, col_guests, col_revenue = st.columns(4)
+    col_sold.metric("Продано", f"{sum(projection['sold']):,d}")
+    col_sold.caption(f"на {projection['revenue_so_far']:,.0f}₽")
+    col_theta.metric("Спрос к прогнозу", f"{theta['mean']:.2f}×")
+    col_theta.caption(f"P10 {theta['p10']:.2f} · P90 {theta['p90']:.2f}")
+    col_guests.metric("Гостей по билетам", f"{guests['mean']:,d}", f"{guests['mean'] - projection['baseline_guests']:+,d}")
+    col_guests.caption(f"P10 {guests['p10']:,d} · P90 {guests['p90']:,d}")
+    col_revenue.metric("Выручка от билетов", f"{revenue['mean']:,.0f}₽")
+    col_revenue.caption(f"P10 {revenue['p10']:,.0f}₽ · P90 {revenue['p90']:,.0f}₽")
+    st.dataframe(
+        [{"Уровень": tier['name'], "Продано": sold, "Итог": final, "Лимит": tier['limit']}
+         for tier, sold, final in zip(tiers, projection['sold'], projection['tier_sales'])],
+        hide_index=True, width='stretch'
+    )
+    st.caption(f"Записей: {projection['records']:,d}, пропущено: {projection['skipped'] + log.skipped:,d}")
+
+@st.fragment
+@profiled("Очередь на входе")
+def show_door_queue(event_name, free_tickets, tier_sales):
+    col_staff, col_scan, col_payment, col_window, col_reps = st.columns(5)
+    staff = col_staff.number_input("Контролёров", 1, value=2, step=1, key="queue_staff")
+    scan_rate = col_scan.number_input("Сканов в минуту", 0.5, value=6.0, step=0.5, key="queue_scan_rate")
+    payment_time = col_payment.number_input("Оплата на входе (мин)", 0.0, value=0.5, step=0.1, key="queue_payment_time")
+    window = col_window.slider("Окно прихода (мин)", 30, 360, 180, 15, key="queue_window")
+    replications = col_reps.number_input("Прогонов", 10, value=1000, step=100, key="queue_replications")
+    presale_guests = sum(tier_sales[:-1]) + free_tickets
+    st.caption(f"С билетом или в списке: {presale_guests}, покупают на входе: {tier_sales[-1]}")
+    if st.button("Смоделировать вход", key="run_door_queue", disabled=presale_guests + tier_sales[-1] == 0):
+        st.session_state.queue_results[event_name] = simulate_door_queue(
+            presale_guests, tier_sales[-1], staff, scan_rate, payment_time, window, replications=replications
+        )
+    queue = st.session_state.queue_results.get(event_name)
+    if queue:
+        col_q1, col_q2, col_q3, col_q4 = st.columns(4)
+        col_q1.metric("Ожидание P50", f"{queue['wait']['p50']:.1f} мин")
+        col_q2.metric("Ожидание P90", f"{queue['wait']['p90']:.1f} мин")
+        col_q3.metric("Очередь, максимум P90", f"{queue['max_queue']['p90']:,.0f}")
+        col_q4.metric("Все внутри, P90", f"{queue['clear_time']['p90']:.0f} мин")
+        st.plotly_chart(build_queue_figure(queue['profile']), width='stretch')
+        st.caption(f"{queue['guests']:,d} гостей × {queue['replications']:,d} прогонов")
+
+@st.fragment
+@profiled("Чувствительность")
+def show_sensitivity(budget, marketing_percentage, risk_amount, free_tickets, tiers, fame_factor, model):
+    relative_step = st.slider("Отклонение входов (%)", 1, 50, 10, 1, key="sensitivity_step") / 100
+    sensitivity = sensitivity_analysis(
+        budget, marketing_percentage, risk_amount, free_tickets, tiers, fame_factor,
+        model['k'], model['marketing_effectiveness'], relative_step
+    )
+    st.plotly_chart(build_tornado_figure(sensitivity), width='stretch')
+    st.dataframe(
+        [{"Параметр": sensitivity_label(row), "Значение": row['value'],
+          "Δ при уменьшении, ₽": row['low'], "Δ при увеличении, ₽": row['high'], "Эластичность": row['elasticity']}
+         for row in sensitivity['inputs']],
+        hide_index=True, width='stretch'
+    )
 
-    return estimated_guests, ticket_sales, avg_ticket_price, ticket_revenue
+@st.fragment
+@profiled("Моделирование неопределённости")
+def show_monte_carlo(event_name, budget, marketing_percentage, risk_amount, free_tickets, tiers, center_fame, model):
+    col_draws, col_seed, col_k, col_effectiveness, col_fame = st.columns(5)
+    n_draws = col_draws.number_input("Прогонов", 1000, value=100_000, step=10_000, key="mc_draws")
+    seed = col_seed.number_input("Seed", 0, value=0, step=1, key="mc_seed")
+    k_spread = col_k.slider("Разброс k (%)", 0, 50, 10, 5, key="mc_k_spread") / 100
+    effectiveness_spread = col_effectiveness.slider("Разброс эффективности (%)", 0, 50, 15, 5, key="mc_effectiveness_spread") / 100
+    fame_spread = col_fame.slider("Разброс известности (%)", 0, 50, 20, 5, key="mc_fame_spread") / 100
+    output = st.text_input("Сохранить прогоны в файл (.arrow или .parquet, необязательно):", key="mc_output").strip()
+
+    if st.button("Запустить моделирование", key="run_monte_carlo"):
+        k, effectiveness = model['k'], model['marketing_effectiveness']
+        distributions = {
+            'k': ('normal', k, k_spread * k),
+            'marketing_effectiveness': ('normal', effectiveness, effectiveness_spread * effectiveness),
+        }
+        if center_fame > 0 and fame_spread > 0:
+            distributions['fame_factor'] = ('uniform', (1 - fame_spread) * center_fame, (1 + fame_spread) * center_fame)
+        else:
+            distributions['fame_factor'] = ('fixed', center_fame)
+        simulate = lambda: run_monte_carlo(
+            budget, marketing_percentage, risk_amount, free_tickets, tiers, center_fame,
+            distributions=distributions, n_draws=n_draws, seed=seed, output=output or None
+        )
+        if output:
+            try:
+                st.session_state.simulation_results[event_name] = simulate()
+            except (ValueError, ImportError, OSError) as e:
+                st.warning(f"Не удалось сохранить прогоны: {e}")
+        else:
+            # При одном seed результат не зависит от числа процессов, поэтому его можно взять из общего кэша
+            inputs = {'budget': budget, 'marketing_percent': marketing_percentage, 'risk_amount': risk_amount,
+                      'free_tickets': free_tickets, 'tiers': tiers, 'fame_factor': center_fame,
+                      'distributions': distributions, 'n_draws': n_draws, 'seed': seed}
+            st.session_state.simulation_results[event_name] = shared_cache().get_or_compute('monte_carlo', inputs, simulate)
+
+    simulation = st.session_state.simulation_results.get(event_name)
+    if simulation:
+        col_mc1, col_mc2, col_mc3, col_mc4 = st.columns(4)
+        for column, metric, label in ((col_mc1, 'total_attendance', "Гости"), (col_mc2, 'ticket_revenue', "Выручка"),
+                                      (col_mc3, 'net_profit', "Чистая прибыль")):
+            stats = simulation[metric]
+            column.metric(f"{label} P50", f"{stats['p50']:,.0f}")
+            column.caption(f"P10 {stats['p10']:,.0f} · P90 {stats['p90']:,.0f}")
+        col_mc4.metric("Вероятность убытка", f"{simulation['loss_probability']:.1%}")
+        col_mc4.caption(f"{simulation['draws']:,d} прогонов, процессов: {simulation['workers']}")
+
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL, show_spinner="Читаем файл результатов…")
+def result_file_summary(path, modified, columns, filters):
+    # modified — время изменения файла: перезаписанный файл считается заново
+    return summarize_result_file(path, list(columns), list(filters))
+
+@st.fragment
+@profiled("Файл результатов")
+def show_result_file():
+    # Файл читается потоком по частям с выбором столбцов, поэтому он может быть больше оперативной памяти
+    path = st.text_input("Файл результатов (.arrow или .parquet):", key="result_file_path").strip()
+    if not path:
+        st.caption("Файлы пишут forecast_cli.py (results.arrow / results.parquet) и моделирование неопределённости.")
+        return
+    try:
+        file_info = result_file_info(path)
+    except (ValueError, ImportError, OSError) as e:
+        st.warning(str(e))
+        return
+    numeric = [name for name, dtype in file_info['columns'].items() if dtype.startswith(('int', 'uint', 'double', 'float'))]
+    st.caption(f"Строк: {file_info['rows']:,d}, {file_info['bytes'] / 2 ** 20:,.1f} МБ, столбцов: {len(file_info['columns'])}")
+    default = [name for name in ('net_profit', 'estimated_guests', 'ticket_revenue') if name in numeric] or numeric[:1]
+    columns = st.multiselect("Столбцы:", numeric, default=default, key=f"result_file_columns_{path}")
+    filters = [line for line in st.text_area("Условия, по одному в строке (например net_profit<0):",
+                                             key="result_file_filters").splitlines() if line.strip()]
+    if not columns:
+        return
+    try:
+        summary = result_file_summary(path, os.path.getmtime(path), tuple(columns), tuple(filters))
+        preview = read_result_file(path, columns, filters, limit=100)
+    except (ValueError, OSError) as e:
+        st.warning(str(e))
+        return
+    st.dataframe(
+        [{"Столбец": column, "Строк": stats['count'], "Среднее": stats.get('mean'), "Минимум": stats.get('min'),
+          "P10": stats.get('p10'), "P50": stats.get('p50'), "P90": stats.get('p90'), "Максимум": stats.get('max')}
+         for column, stats in summary.items()],
+        hide_index=True, width='stretch'
+    )
+    shown = st.selectbox("Распределение:", columns, key=f"result_file_histogram_{path}")
+    if summary[shown]['count']:
+        st.plotly_chart(build_histogram_figure(summary[shown]['histogram'], shown), width='stretch')
+    st.caption("Первые строки выборки")
+    st.dataframe(preview, hide_index=True, width='stretch')
 
 def main():
+    st.set_page_config(page_title="Прогноз на мероприятие", layout="wide", initial_sidebar_state="collapsed")
     st.title("Прогноз на мероприятие")
+    begin_rerun_profile()
 
-    events = {
-        'Neuropunk': {'budget': 500000, 'guests': 500, 'ticket_price': 2000, 'marketing_percent': 0.2, 'fame_factor': 10.15, 'risk_amount': 0},
-        'Bass Vibration IV': {'budget': 113500, 'guests': 110, 'ticket_price': 1200, 'marketing_percent': 0.2, 'fame_factor': 1.0, 'risk_amount': 96000},
-        'Hardline I': {'budget': 120000, 'guests': 140, 'ticket_price': 940, 'marketing_percent': 0.2, 'fame_factor': 1.0, 'risk_amount': 25000}
-    }
+    with span("Каталог"):
+        events, historical_pre_sales = load_events(show_catalog_filters())
+    with span("Модель спроса"):
+        model = show_demand_model_panel()
 
     default_budget, default_risk, default_marketing = 115000, 0, 20  # Изменены дефолтные значения
-    default_pre_sale = {
+    default_tiers = stage_tiers({
         'stage1_price': 500, 'stage1_limit': 50,
         'stage2_price': 600, 'stage2_limit': 50,
         'stage3_price': 700, 'stage3_limit': 50,
         'door_price': 1000, 'door_limit': 999
-    }
-
-    hardline_pre_sale = {
-        'stage1_price': 400, 'stage1_limit': 100,
-        'stage2_price': 400, 'stage2_limit': 100,
-        'stage3_price': 700, 'stage3_limit': 50,
-        'door_price': 1000, 'door_limit': 849
-    }
-    bass_vibration_pre_sale = {
-        'stage1_price': 900, 'stage1_limit': 21,
-        'stage2_price': 1100, 'stage2_limit': 31,
-        'stage3_price': 1500, 'stage3_limit': 21,
-        'door_price': 1000, 'door_limit': 0
-    }
-    neuropunk_pre_sale = {
-        'stage1_price': 1000, 'stage1_limit': 100,
-        'stage2_price': 1200, 'stage2_limit': 100,
-        'stage3_price': 1400, 'stage3_limit': 100,
-        'door_price': 1800, 'door_limit': 999
-    }
-
-    if 'event_versions' not in st.session_state:
-        st.session_state.event_versions = {name: name for name in events.keys()}
-    if 'budget_values' not in st.session_state:
-        st.session_state.budget_values = {name: events[name]['budget'] for name in events.keys()}
-        st.session_state.budget_values['New'] = default_budget  # Теперь 115,000 ₽
-    if 'risk_values' not in st.session_state:
-        st.session_state.risk_values = {name: events[name]['risk_amount'] for name in events.keys()}
-        st.session_state.risk_values['New'] = default_risk  # Теперь 0 ₽
-    if 'marketing_values' not in st.session_state:
-        st.session_state.marketing_values = {name: int(events[name]['marketing_percent'] * 100) for name in events.keys()}
-        st.session_state.marketing_values['New'] = default_marketing
-    if 'pre_sale_values' not in st.session_state:
-        st.session_state.pre_sale_values = {name: default_pre_sale.copy() for name in events.keys()}
-        st.session_state.pre_sale_values['New'] = default_pre_sale.copy()
-        st.session_state.pre_sale_values['Hardline I'] = hardline_pre_sale.copy()
-        st.session_state.pre_sale_values['Bass Vibration IV'] = bass_vibration_pre_sale.copy()
-        st.session_state.pre_sale_values['Neuropunk'] = neuropunk_pre_sale.copy()
-    if 'checkbox_states' not in st.session_state:
-        st.session_state.checkbox_states = {'Neuropunk': True, 'Bass Vibration IV': True, 'Hardline I': True, 'New': True}
-    if 'free_tickets' not in st.session_state:
-        st.session_state.free_tickets = {'Neuropunk': 20, 'Bass Vibration IV': 35, 'Hardline I': 21, 'New': 20}  # Теперь 20
-    if 'current_event' not in st.session_state:
-        st.session_state.current_event = 'New'
+    })
+
+    with span("Состояние сессии"):
+        if 'versions' not in st.session_state:
+            st.session_state.versions = VersionStore()
+        if 'budget_values' not in st.session_state:
+            st.session_state.budget_values = {'New': default_budget}  # Теперь 115,000 ₽
+        if 'risk_values' not in st.session_state:
+            st.session_state.risk_values = {'New': default_risk}  # Теперь 0 ₽
+        if 'marketing_values' not in st.session_state:
+            st.session_state.marketing_values = {'New': default_marketing}
+        if 'pre_sale_values' not in st.session_state:
+            st.session_state.pre_sale_values = {'New': [dict(tier) for tier in default_tiers]}
+        if 'tier_editor_base' not in st.session_state:
+            st.session_state.tier_editor_base = {}
+        if 'free_tickets' not in st.session_state:
+            st.session_state.free_tickets = {'New': 20}  # Теперь 20
+        if 'current_event' not in st.session_state:
+            st.session_state.current_event = 'New'
+        if 'optimizer_results' not in st.session_state:
+            st.session_state.optimizer_results = {}
+        if 'simulation_results' not in st.session_state:
+            st.session_state.simulation_results = {}
+        if 'presale_timelines' not in st.session_state:
+            st.session_state.presale_timelines = {}
+        if 'metric_graphs' not in st.session_state:
+            st.session_state.metric_graphs = {}
+        if 'queue_results' not in st.session_state:
+            st.session_state.queue_results = {}
+        if 'live_sales' not in st.session_state:
+            st.session_state.live_sales = {}
+        if 'workspace' not in st.session_state:
+            st.session_state.workspace = ScenarioWorkspace()
+            st.session_state.workspace_editor_base = []
+
+        # Мероприятия из каталога, появившиеся после первого запуска сессии, получают значения по умолчанию
+        for name, event in events.items():
+            st.session_state.budget_values.setdefault(name, event['budget'])
+            st.session_state.risk_values.setdefault(name, event['risk_amount'])
+            st.session_state.marketing_values.setdefault(name, int(event['marketing_percent'] * 100))
+            st.session_state.pre_sale_values.setdefault(name, [dict(tier) for tier in historical_pre_sales.get(name, default_tiers)])
+            st.session_state.free_tickets.setdefault(name, event['free_tickets'])
+            if not st.session_state.versions.latest(name):
+                st.session_state.versions.commit(name, event_settings(name))
+        if st.session_state.current_event != 'New' and st.session_state.current_event not in events:
+            st.session_state.current_event = 'New'
 
     col_left, col_right = st.columns([1, 1])
 
-    with col_left:
+    with col_left, span("Настройки"):
         st.subheader("Настройки")
         col_settings_left, col_settings_middle, col_settings_right = st.columns([1, 0.25, 1])
 
@@ -139,10 +744,7 @@ def main():
             key="event_name"
         )
         st.session_state.current_event = current_event_name
-        display_event_name = get_next_version(current_event_name, events, st.session_state.event_versions)
-
-        if current_event_name != 'New' and display_event_name != st.session_state.event_versions.get(current_event_name, current_event_name):
-            st.session_state.event_versions[current_event_name] = display_event_name
+        display_event_name = get_next_version(current_event_name, events, st.session_state.versions)
 
         marketing_percentage = col_settings_left.slider(
             "Маркетинг (%):", 0, 100, st.session_state.marketing_values.get(current_event_name, default_marketing), 5,
@@ -166,171 +768,121 @@ def main():
         st.session_state.marketing_values[current_event_name] = int(marketing_percentage * 100)
         st.session_state.free_tickets[current_event_name] = free_tickets
 
-    with col_right:
+    fame_factor = event_fame_factor(current_event_name, events, model)
+
+    with col_right, span("Продажа"):
         st.subheader("Продажа")
-        col_stage1, col_stage2, col_stage3, col_door = st.columns(4)
-
-        pre_sale = st.session_state.pre_sale_values[current_event_name]
-        with col_stage1:
-            stage1_price = st.number_input("Цена Этап 1", 1, value=pre_sale['stage1_price'], step=100, key=f"stage1_price_{current_event_name}")
-            stage1_limit = st.number_input("Количество", 0, value=pre_sale['stage1_limit'], step=1, key=f"stage1_limit_{current_event_name}")
-        with col_stage2:
-            stage2_price = st.number_input("Цена Этап 2", 1, value=pre_sale['stage2_price'], step=100, key=f"stage2_price_{current_event_name}")
-            stage2_limit = st.number_input("Количество", 0, value=pre_sale['stage2_limit'], step=1, key=f"stage2_limit_{current_event_name}")
-        with col_stage3:
-            stage3_price = st.number_input("Цена Этап 3", 1, value=pre_sale['stage3_price'], step=100, key=f"stage3_price_{current_event_name}")
-            stage3_limit = st.number_input("Количество", 0, value=pre_sale['stage3_limit'], step=1, key=f"stage3_limit_{current_event_name}")
-        with col_door:
-            door_price = st.number_input("Цена На входе", 1, value=pre_sale['door_price'], step=100, key=f"door_price_{current_event_name}")
-            door_limit = st.number_input("Количество", 0, value=pre_sale['door_limit'], step=1, key=f"door_limit_{current_event_name}")
-
-        st.session_state.pre_sale_values[current_event_name] = {
-            'stage1_price': stage1_price, 'stage1_limit': stage1_limit,
-            'stage2_price': stage2_price, 'stage2_limit': stage2_limit,
-            'stage3_price': stage3_price, 'stage3_limit': stage3_limit,
-            'door_price': door_price, 'door_limit': door_limit
+        tiers = edit_tiers(current_event_name)
+        if not tiers:
+            st.warning("Добавьте хотя бы один уровень билетов.")
+            st.stop()
+        st.session_state.pre_sale_values[current_event_name] = tiers
+
+        with st.expander("Оптимизация цен"):
+            col_objective, col_monotonic = st.columns(2)
+            objective = col_objective.selectbox(
+                "Максимизировать:", options=['ticket_revenue', 'net_profit'],
+                format_func={'ticket_revenue': "Выручку от билетов", 'net_profit': "Чистую прибыль"}.get,
+                key=f"objective_{current_event_name}"
+            )
+            monotonic = col_monotonic.checkbox("Цены не убывают по уровням", value=True, key=f"monotonic_{current_event_name}")
+            limits = [tier['limit'] for tier in tiers]
+            st.button(
+                "Подобрать цены", key=f"optimize_{current_event_name}", on_click=apply_optimized_prices,
+                args=(current_event_name, new_budget, marketing_percentage, limits, free_tickets, risk_amount,
+                      fame_factor, objective, monotonic, model)
+            )
+            optimizer_result = st.session_state.optimizer_results.get(current_event_name)
+            if optimizer_result:
+                st.caption(f"Лучшее значение: {optimizer_result['value']:,.0f}₽, "
+                           f"проверено комбинаций: {optimizer_result['evaluations']:,d}")
+                if optimizer_result['surface'] is not None:
+                    surface_fig = build_price_surface_figure(optimizer_result['surface'], tiers[0]['name'], tiers[-1]['name'])
+                    st.plotly_chart(surface_fig, width='stretch')
+
+    with span("Прогноз"):
+        forecast = event_forecast(current_event_name, new_budget, marketing_percentage, risk_amount, free_tickets, tiers,
+                                  fame_factor, model)
+
+    marketing_cost = forecast['marketing_cost']
+    estimated_guests, tier_sales = forecast['estimated_guests'], forecast['tier_sales']
+    avg_ticket_price, ticket_revenue = forecast['avg_ticket_price'], forecast['ticket_revenue']
+    total_attendance = forecast['total_attendance']
+    profit = forecast['profit']
+    bar_revenue = forecast['bar_revenue']
+    remaining_budget = forecast['remaining_budget']
+    net_profit = forecast['net_profit']
+
+    with span("Точки графика"):
+        points = comparison_points(events, st.session_state.free_tickets, current_event_name, display_event_name,
+                                   new_budget - risk_amount, total_attendance, avg_ticket_price)
+
+    show_comparison_chart(points, current_event_name if current_event_name in events else display_event_name)
+
+    with span("Метрики"):
+        st.subheader("Расчетные данные")
+        col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
+        with col_metrics1:
+            st.metric("Маркетинг", f"{marketing_cost:,.0f}₽ ({marketing_percentage:.0%})")
+        with col_metrics2:
+            st.metric("Остаток бюджета", f"{remaining_budget:,.0f}₽")
+        with col_metrics3:
+            st.metric("Количество гостей", f"{total_attendance:,d}")
+        with col_metrics4:
+            st.metric("Выручка от продажи билетов", f"{ticket_revenue:,.0f}₽")
+
+        st.subheader("Распределение билетов")
+        for start in range(0, len(tiers), 4):
+            for column, tier, sold in zip(st.columns(4), tiers[start:start + 4], tier_sales[start:start + 4]):
+                column.metric(tier['name'], f"{sold} шт. по {tier['price']}₽")
+        st.caption(f"Средняя цена билета {avg_ticket_price:,.0f}₽ — равновесие спроса и цены найдено "
+                   f"за {forecast['solver_iterations']} итераций")
+
+        st.subheader("Выручка")
+        col_revenue1, col_revenue2, col_revenue3 = st.columns([1, 1, 1])
+        with col_revenue1:
+            st.metric("Выручка бара", f"{bar_revenue:,.0f}₽")
+        with col_revenue2:
+            st.metric("Прибыль", f"{profit:,.0f}₽")
+        with col_revenue3:
+            st.metric("Чистая прибыль", f"{net_profit:,.0f}₽")
+
+    show_cache_debug_panel()
+    show_metric_graph_panel(current_event_name)
+
+    with st.expander("История версий"):
+        show_version_history(current_event_name)
+
+    with st.expander("Сравнение сценариев"):
+        current_scenario = {
+            'budget': new_budget, 'marketing_percent': marketing_percentage, 'risk_amount': risk_amount,
+            'free_tickets': free_tickets, 'tiers': [dict(tier) for tier in tiers], 'fame_factor': fame_factor,
         }
+        show_scenario_workspace(current_scenario, display_event_name, model)
 
-    marketing_cost = new_budget * marketing_percentage
-    min_fame, max_fame = 1.0, 10.15
-    min_marketing, max_marketing = 22700, 100000
-    fame_factor = min_fame + (max_fame - min_fame) * min(1.0, max(0.0, (marketing_cost - min_marketing) / (max_marketing - min_marketing)))
-    if current_event_name in events:
-        fame_factor = events[current_event_name]['fame_factor']
+    with st.expander("Маркетинг на сезон"):
+        show_portfolio_allocator(event_options, events, model)
 
-    marketing_effectiveness = 0.2685
-    marketing_guests = marketing_cost * marketing_effectiveness * fame_factor
+    with st.expander("Продажи по дням"):
+        show_presale_timeline(current_event_name, estimated_guests, tiers, tier_sales)
 
-    estimated_guests, ticket_sales, avg_ticket_price, ticket_revenue = calculate_guests_and_price(
-        stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
-        door_price, door_limit, marketing_guests, free_tickets, fame_factor
-    )
+    with st.expander("Живые продажи"):
+        show_live_sales(current_event_name, tiers, forecast['marketing_guests'], model)
 
-    total_attendance = estimated_guests + free_tickets
-    profit = new_budget - risk_amount - marketing_cost + ticket_revenue
-    bar_revenue = total_attendance * 1300
-    remaining_budget = new_budget - risk_amount - marketing_cost
-    net_profit = profit - risk_amount
-
-    df_data = {
-        'Бюджет': [],
-        'Количество гостей': [],
-        'Стоимость входa': [],
-        'Мероприятие': []
-    }
-    for event in events.keys():
-        if event == current_event_name:
-            df_data['Бюджет'].append(new_budget - risk_amount)
-            df_data['Количество гостей'].append(total_attendance)
-            df_data['Стоимость входa'].append(avg_ticket_price)
-        else:
-            df_data['Бюджет'].append(events[event]['budget'] - events[event]['risk_amount'])
-            df_data['Количество гостей'].append(events[event]['guests'] + st.session_state.free_tickets.get(event, 0))
-            df_data['Стоимость входa'].append(events[event]['ticket_price'])
-        df_data['Мероприятие'].append(event)
-
-    if current_event_name == 'New':
-        df_data['Бюджет'].append(new_budget - risk_amount)
-        df_data['Количество гостей'].append(total_attendance)
-        df_data['Стоимость входa'].append(avg_ticket_price)
-        df_data['Мероприятие'].append(display_event_name)
-
-    df = pd.DataFrame(df_data)
-
-    fig = go.Figure()
-    colors = {'Neuropunk': 'yellow', 'Bass Vibration IV': 'green', 'Hardline I': '#ff005e', 'New': '#ff00ff'}
-    visibility = {
-        'Neuropunk': st.session_state.checkbox_states['Neuropunk'],
-        'Bass Vibration IV': st.session_state.checkbox_states['Bass Vibration IV'],
-        'Hardline I': st.session_state.checkbox_states['Hardline I'],
-        'New': st.session_state.checkbox_states.get('New', True) and current_event_name == 'New'
-    }
+    with st.expander("Очередь на входе"):
+        show_door_queue(current_event_name, free_tickets, tier_sales)
 
-    max_guests = max(df['Количество гостей'])
-
-    for _, row in df.iterrows():
-        event_name = row['Мероприятие']
-        base_event_name = 'New' if event_name.startswith('New') else event_name
-        if base_event_name in events:
-            base_event_name = event_name
-        if visibility.get(base_event_name, False):
-            fig.add_shape(type="line", x0=row['Количество гостей'], y0=0, x1=row['Количество гостей'], y1=row['Стоимость входa'],
-                          line=dict(color='#555555', dash="dash", width=1), layer='below')
-            fig.add_shape(type="line", x0=0, y0=row['Стоимость входa'], x1=row['Количество гостей'], y1=row['Стоимость входa'],
-                          line=dict(color='#555555', dash="dash", width=1), layer='below')
-
-            fig.add_trace(go.Scatter(
-                x=[row['Количество гостей']],
-                y=[row['Стоимость входa']],
-                mode='markers+text',
-                name=event_name,
-                marker=dict(size=15, color=colors.get(base_event_name, '#ff00ff'), opacity=1),
-                text=[event_name],
-                textposition='top center',
-                textfont=dict(color='white', size=12),
-                showlegend=False
-            ))
-
-    for i in range(0, int(max_guests) + 1, 100):
-        fig.add_shape(type="line", x0=i, y0=0, x1=i, y1=max(df['Стоимость входa']),
-                      line=dict(color='#333333', width=1), layer='below')
-    for i in range(0, int(max(df['Стоимость входa'])) + 1, 500):
-        fig.add_shape(type="line", x0=0, y0=i, x1=max_guests, y1=i,
-                      line=dict(color='#333333', width=1), layer='below')
-
-    fig.update_layout(
-        xaxis_title="Количество гостей",
-        yaxis_title="Усреднённая стоимость билета (₽)",
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='white', size=12),
-        height=500,
-        width=None,
-        margin=dict(l=10, r=10, t=10, b=30)
-    )
+    with st.expander("Чувствительность чистой прибыли"):
+        show_sensitivity(new_budget, marketing_percentage, risk_amount, free_tickets, tiers, fame_factor, model)
+
+    with st.expander("Моделирование неопределённости"):
+        show_monte_carlo(current_event_name, new_budget, marketing_percentage, risk_amount, free_tickets, tiers,
+                         forecast['fame_factor'], model)
+
+    with st.expander("Файл результатов"):
+        show_result_file()
 
-    st.plotly_chart(fig, use_container_width=True)
-
-    col_check1, col_check2, col_check3, col_check4 = st.columns(4)
-    with col_check1:
-        show_neuropunk = st.checkbox("Neuropunk", value=st.session_state.checkbox_states['Neuropunk'], key="show_neuropunk")
-        st.session_state.checkbox_states['Neuropunk'] = show_neuropunk
-    with col_check2:
-        show_bass_vibration = st.checkbox("Bass Vibration IV", value=st.session_state.checkbox_states['Bass Vibration IV'], key="show_bass_vibration")
-        st.session_state.checkbox_states['Bass Vibration IV'] = show_bass_vibration
-    with col_check3:
-        show_hardline = st.checkbox("Hardline I", value=st.session_state.checkbox_states['Hardline I'], key="show_hardline")
-        st.session_state.checkbox_states['Hardline I'] = show_hardline
-    with col_check4:
-        show_new = st.checkbox("New", value=st.session_state.checkbox_states.get('New', True), key="show_new")
-        st.session_state.checkbox_states['New'] = show_new
-
-    st.subheader("Расчетные данные")
-    col_metrics1, col_metrics2, col_metrics3, col_metrics4 = st.columns(4)
-    with col_metrics1:
-        st.metric("Маркетинг", f"{marketing_cost:,.0f}₽ ({marketing_percentage:.0%})")
-    with col_metrics2:
-        st.metric("Остаток бюджета", f"{remaining_budget:,.0f}₽")
-    with col_metrics3:
-        st.metric("Количество гостей", f"{total_attendance:,d}")
-    with col_metrics4:
-        st.metric("Выручка от продажи билетов", f"{ticket_revenue:,.0f}₽")
-
-    st.subheader("Распределение билетов")
-    col_ts1, col_ts2, col_ts3, col_ts4 = st.columns([0.25, 0.25, 0.25, 0.25])
-    with col_ts1: st.metric("Этап 1", f"{ticket_sales['stage1']} шт. по {stage1_price}₽")
-    with col_ts2: st.metric("Этап 2", f"{ticket_sales['stage2']} шт. по {stage2_price}₽")
-    with col_ts3: st.metric("Этап 3", f"{ticket_sales['stage3']} шт. по {stage3_price}₽")
-    with col_ts4: st.metric("На входе", f"{ticket_sales['door']} шт. по {door_price}₽")
-
-    st.subheader("Выручка")
-    col_revenue1, col_revenue2, col_revenue3 = st.columns([1, 1, 1])
-    with col_revenue1:
-        st.metric("Выручка бара", f"{bar_revenue:,.0f}₽")
-    with col_revenue2:
-        st.metric("Прибыль", f"{profit:,.0f}₽")
-    with col_revenue3:
-        st.metric("Чистая прибыль", f"{net_profit:,.0f}₽")
+    show_profile_panel()
 
 if __name__ == "__main__":
     main()
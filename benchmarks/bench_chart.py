@@ -0,0 +1,137 @@
+"""Размер JSON и время сборки сравнительного графика.
+
+Запуск: python benchmarks/bench_chart.py
+
+Первая таблица — shapes на каждую линию сетки против встроенной сетки осей при растущем числе гостей,
+вторая — трейс на мероприятие через iterrows против сборки из столбцов (WebGL и ячейки сетки)
+при растущем числе мероприятий в истории.
+"""
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from charts import BINNING_THRESHOLD, COLORS, LABEL_THRESHOLD, build_comparison_figure
+
+EVENTS = ('Neuropunk', 'Bass Vibration IV', 'Hardline I')
+REPEATS = 5
+HISTORY_SIZES = (4, 300, 3_000, 30_000)
+LEGACY_MAX_EVENTS = 300
+
+
+def legacy_comparison_figure(points, visibility, known_events):
+    # points — кортежи (мероприятие, бюджет, количество гостей, стоимость входа)
+    df = pd.DataFrame(list(points), columns=['Мероприятие', 'Бюджет', 'Количество гостей', 'Стоимость входa'])
+
+    fig = go.Figure()
+    max_guests = max(df['Количество гостей'])
+
+    for _, row in df.iterrows():
+        event_name = row['Мероприятие']
+        base_event_name = 'New' if event_name.startswith('New') else event_name
+        if base_event_name in known_events:
+            base_event_name = event_name
+        if visibility.get(base_event_name, False):
+            fig.add_shape(type="line", x0=row['Количество гостей'], y0=0, x1=row['Количество гостей'], y1=row['Стоимость входa'],
+                          line=dict(color='#555555', dash="dash", width=1), layer='below')
+            fig.add_shape(type="line", x0=0, y0=row['Стоимость входa'], x1=row['Количество гостей'], y1=row['Стоимость входa'],
+                          line=dict(color='#555555', dash="dash", width=1), layer='below')
+
+            fig.add_trace(go.Scatter(
+                x=[row['Количество гостей']],
+                y=[row['Стоимость входa']],
+                mode='markers+text',
+                name=event_name,
+                marker=dict(size=15, color=COLORS.get(base_event_name, '#ff00ff'), opacity=1),
+                text=[event_name],
+                textposition='top center',
+                textfont=dict(color='white', size=12),
+                showlegend=False
+            ))
+
+    for i in range(0, int(max_guests) + 1, 100):
+        fig.add_shape(type="line", x0=i, y0=0, x1=i, y1=max(df['Стоимость входa']),
+                      line=dict(color='#333333', width=1), layer='below')
+    for i in range(0, int(max(df['Стоимость входa'])) + 1, 500):
+        fig.add_shape(type="line", x0=0, y0=i, x1=max_guests, y1=i,
+                      line=dict(color='#333333', width=1), layer='below')
+
+    fig.update_layout(
+        xaxis_title="Количество гостей",
+        yaxis_title="Усреднённая стоимость билета (₽)",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12),
+        height=500,
+        width=None,
+        margin=dict(l=10, r=10, t=10, b=30)
+    )
+    return fig
+
+
+def points_for(max_guests):
+    return (
+        ('Neuropunk', 500000, max_guests, 2000),
+        ('Bass Vibration IV', 113500, 145, 1200),
+        ('Hardline I', 120000, 161, 940),
+        ('New', 115000, 194, 634.15),
+    )
+
+
+def history_points(n_events, seed=0):
+    rng = np.random.default_rng(seed)
+    guests = rng.integers(50, 3000, n_events)
+    price = rng.integers(300, 3000, n_events)
+    return tuple((f'Event {i}', 100000, int(g), int(p)) for i, (g, p) in enumerate(zip(guests, price))) + (
+        ('New', 115000, 194, 634.15),
+    )
+
+
+def measure(build, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        payload = build().to_json()
+        timings.append(time.perf_counter() - started)
+    return len(payload), statistics.median(timings)
+
+
+def mode(n_points):
+    if n_points <= LABEL_THRESHOLD:
+        return 'labels'
+    return 'binned' if n_points > BINNING_THRESHOLD else 'webgl'
+
+
+def main():
+    visibility = {name: True for name in EVENTS + ('New',)}
+    print(f"{'max_guests':>10} | {'before, KB':>10} {'before, ms':>10} | {'after, KB':>9} {'after, ms':>9}")
+    for max_guests in (500, 5_000, 50_000):
+        points = points_for(max_guests)
+        before_size, before_time = measure(lambda: legacy_comparison_figure(points, visibility, EVENTS))
+        after_size, after_time = measure(lambda: build_comparison_figure(points, highlight='New'))
+        print(f"{max_guests:>10} | {before_size / 1024:>10.1f} {before_time * 1000:>10.1f} | "
+              f"{after_size / 1024:>9.1f} {after_time * 1000:>9.1f}")
+
+    print()
+    print(f"{'events':>10} | {'before, KB':>10} {'before, ms':>10} | {'after, KB':>9} {'after, ms':>9} {'mode':>7}")
+    for n_events in HISTORY_SIZES:
+        points = history_points(n_events)
+        known = tuple(name for name, *_ in points[:-1])
+        if n_events <= LEGACY_MAX_EVENTS:
+            legacy_visibility = dict.fromkeys(known + ('New',), True)
+            before_size, before_time = measure(lambda: legacy_comparison_figure(points, legacy_visibility, known), repeats=1)
+            before = f"{before_size / 1024:>10.1f} {before_time * 1000:>10.1f}"
+        else:
+            before = f"{'-':>10} {'-':>10}"
+        after_size, after_time = measure(lambda: build_comparison_figure(points, highlight='New'))
+        print(f"{n_events:>10} | {before} | {after_size / 1024:>9.1f} {after_time * 1000:>9.1f} {mode(len(points)):>7}")
+
+
+if __name__ == "__main__":
+    main()
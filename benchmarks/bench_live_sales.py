@@ -0,0 +1,75 @@
+"""Пропускная способность чтения журнала продаж и онлайн-обновления спроса.
+
+Запуск: python benchmarks/bench_live_sales.py [--records 100000] [--batch 1000]
+
+Журнал дописывается пачками по --batch записей, после каждой пачки LiveDemand.ingest()
+дочитывает хвост; отдельно замеряется projection() — пересчёт итога по уровням.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import forecast_event, stage_tiers
+from live_sales import LiveDemand, SalesLog
+
+TIERS = stage_tiers({
+    'stage1_price': 500, 'stage1_limit': 5000, 'stage2_price': 600, 'stage2_limit': 5000,
+    'stage3_price': 700, 'stage3_limit': 5000, 'door_price': 1000, 'door_limit': 99999,
+})
+DAY = 86400
+REPEATS = 20
+
+
+def lines(fmt, records, start):
+    for i in range(start, start + records):
+        tier = TIERS[i % 3]
+        if fmt == 'csv':
+            yield f"{i},{tier['name']},1,{tier['price']}\n"
+        else:
+            yield json.dumps({'time': i, 'tier': tier['name'], 'quantity': 1, 'price': tier['price']}, ensure_ascii=False) + '\n'
+
+
+def run(fmt, records, batch):
+    forecast = forecast_event(3_000_000, 0.2, 0, 0, TIERS, fame_factor=1.0)
+    live = LiveDemand(TIERS, forecast['marketing_guests'], 0, 60 * DAY)
+    path = os.path.join(tempfile.mkdtemp(), f'sales.{fmt}')
+    with open(path, 'w', encoding='utf-8') as f:
+        if fmt == 'csv':
+            f.write('time,tier,quantity,price\n')
+    log = SalesLog(path)
+    elapsed = 0.0
+    for start in range(0, records, batch):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(lines(fmt, min(batch, records - start), start))
+        started = time.perf_counter()
+        live.ingest(log)
+        elapsed += time.perf_counter() - started
+    assert live.records == records, (live.records, live.skipped)
+
+    projection = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        live.projection()
+        projection.append(time.perf_counter() - started)
+    return records / elapsed, statistics.median(projection) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+    print(f"{'format':<8} {'records/s':>12} {'projection, ms':>15}")
+    for fmt in ('jsonl', 'csv'):
+        rate, projection_ms = run(fmt, args.records, args.batch)
+        print(f"{fmt:<8} {rate:>12,.0f} {projection_ms:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Общий кэш результатов между процессами: холодный и тёплый расчёт, параллельные воркеры, вытеснение.
+
+Запуск: python benchmarks/bench_shared_cache.py [--scenarios 2000] [--workers 4]
+
+Каждый «воркер» — отдельный процесс, как у gunicorn: он считает набор сценариев по одному, как
+запросы POST /forecast, и подбор цен через optimize_prices, а кэш у всех — один файл SQLite.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+OPTIMIZER_INPUTS = {'budget': 115000, 'marketing_percent': 0.2, 'limits': [50, 50, 50, 999]}
+
+
+def scenarios(count, offset=0):
+    return [{
+        'budget': 100_000 + 10 * (offset + i), 'marketing_percent': 0.2, 'risk_amount': 0, 'free_tickets': 20,
+        'stage1_price': 500, 'stage1_limit': 50, 'stage2_price': 600, 'stage2_limit': 50,
+        'stage3_price': 700, 'stage3_limit': 50, 'door_price': 1000, 'door_limit': 999,
+    } for i in range(count)]
+
+
+def run_worker(args):
+    # Новый процесс — как перезапущенный воркер: в памяти ничего нет, всё берётся из файла
+    count, offset = args
+    from api import _forecast_chunk
+    from optimizer import optimize_prices
+    from shared_cache import shared_cache
+
+    started = time.perf_counter()
+    for scenario in scenarios(count, offset):
+        _forecast_chunk([scenario])
+    forecast_s = time.perf_counter() - started
+    started = time.perf_counter()
+    shared_cache().get_or_compute('optimize_prices', OPTIMIZER_INPUTS, lambda: optimize_prices(**OPTIMIZER_INPUTS))
+    optimize_s = time.perf_counter() - started
+    stats = shared_cache().stats()
+    return forecast_s, optimize_s, stats['hits'], stats['misses']
+
+
+def run_pool(workers, count, offsets):
+    with multiprocessing.get_context('spawn').Pool(workers) as pool:
+        return pool.map(run_worker, [(count, offset) for offset in offsets])
+
+
+def report(label, results):
+    for forecast_s, optimize_s, hits, misses in results:
+        print(f"{label:<28} {forecast_s * 1000:>12.1f} {optimize_s * 1000:>14.1f} {hits:>8,d} {misses:>8,d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenarios', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    # Переменные окружения читаются при импорте shared_cache, поэтому задаются до запуска процессов
+    os.environ['FFP_SHARED_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+
+    print(f"{'':<28} {'forecast, ms':>12} {'optimize, ms':>14} {'hits':>8} {'misses':>8}")
+    report("холодный, 1 процесс", run_pool(1, args.scenarios, [0]))
+    report("тёплый перезапуск", run_pool(1, args.scenarios, [0]))
+    report(f"{args.workers} воркера, общие входы", run_pool(args.workers, args.scenarios, [0] * args.workers))
+    report(f"{args.workers} воркера, новые входы", run_pool(
+        args.workers, args.scenarios, [(i + 1) * args.scenarios for i in range(args.workers)]
+    ))
+
+    os.environ['FFP_SHARED_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(), 'results.sqlite')
+    os.environ['FFP_SHARED_CACHE_MB'] = '0.5'
+    report(f"{args.workers} воркера, лимит 0.5 МБ", run_pool(
+        args.workers, args.scenarios, [i * args.scenarios for i in range(args.workers)]
+    ))
+    size = os.path.getsize(os.environ['FFP_SHARED_CACHE_PATH']) / 2 ** 20
+    print(f"размер файла с лимитом 0.5 МБ: {size:.2f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Время холодного импорта точек входа по данным python -X importtime.
+
+Запуск: python benchmarks/bench_startup.py
+
+«app + plotly/pandas» воспроизводит прежний app.py, который импортировал
+plotly.graph_objects и pandas при загрузке модуля.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPEATS = 5
+TARGETS = (
+    ("forecast (ядро)", "import forecast"),
+    ("forecast_cli", "import forecast_cli"),
+    ("app", "import app"),
+    ("app + plotly/pandas", "import app, plotly.graph_objects, pandas; plotly.graph_objects.Figure"),
+)
+
+
+def import_time_ms(statement):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Модули верхнего уровня идут с одним пробелом, вложенные — с отступом
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            total += int(cumulative)
+    return total / 1000
+
+
+def main():
+    print(f"{'entry point':<22} {'import, ms':>10}")
+    for label, statement in TARGETS:
+        timings = [import_time_ms(statement) for _ in range(REPEATS)]
+        print(f"{label:<22} {statistics.median(timings):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
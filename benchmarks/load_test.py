@@ -0,0 +1,115 @@
+"""Нагрузочный тест ASGI-сервиса прогноза: задержки p50/p99 и пропускная способность.
+
+    uvicorn api:app --port 8000 &
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --endpoint batch --batch-size 1000
+
+Клиент на asyncio без внешних зависимостей: держит --concurrency keep-alive соединений
+и отправляет запросы в течение --duration секунд.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+SCENARIO = {
+    'budget': 115000, 'marketing_percent': 0.2, 'risk_amount': 0, 'free_tickets': 20,
+    'stage1_price': 500, 'stage1_limit': 50, 'stage2_price': 600, 'stage2_limit': 50,
+    'stage3_price': 700, 'stage3_limit': 50, 'door_price': 1000, 'door_limit': 999,
+}
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        parts = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            parts.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(parts)
+    else:
+        body = await reader.read()
+    return status, body
+
+
+async def _worker(host, port, path, payload, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n"
+    ).encode('latin-1') + payload
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def run(url, endpoint, batch_size, concurrency, duration):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    if endpoint == 'batch':
+        path, payload, scenarios_per_request = '/forecast/batch', json.dumps([SCENARIO] * batch_size), batch_size
+    else:
+        path, payload, scenarios_per_request = '/forecast', json.dumps(SCENARIO), 1
+
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, path, payload.encode('utf-8'), deadline, latencies, errors) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    print(f"endpoint:      {path} (scenarios per request: {scenarios_per_request})")
+    print(f"concurrency:   {concurrency}, duration: {elapsed:.1f} s")
+    print(f"requests:      {len(latencies)}, errors: {len(errors)}")
+    if latencies:
+        print(f"latency p50:   {_percentile(latencies, 50) * 1000:.1f} ms")
+        print(f"latency p99:   {_percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"latency mean:  {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"throughput:    {len(latencies) / elapsed:.1f} req/s, {len(latencies) * scenarios_per_request / elapsed:.0f} scenarios/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса прогноза")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--endpoint', choices=('single', 'batch'), default='single')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.endpoint, args.batch_size, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get('FFP_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.ffp_cache'))
+CALIBRATION_FIELDS = ('name', 'budget', 'marketing_percent', 'fame_factor', 'guests', 'ticket_price')
+
+
+def dataset_hash(events, fit_fame=False):
+    rows = sorted([event[field] for field in CALIBRATION_FIELDS] for event in events)
+    payload = json.dumps({'rows': rows, 'fit_fame': fit_fame}, separators=(',', ':'), default=float)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def fit_demand(events, fit_fame=False):
+    # guests = marketing_cost * effectiveness * fame * exp(-k * price) линейна в логарифмах:
+    # ln(guests / (marketing_cost * fame)) = ln(effectiveness) - k * price
+    names = [event['name'] for event in events]
+    marketing_cost = np.array([event['budget'] * event['marketing_percent'] for event in events], dtype=float)
+    fame = np.array([event['fame_factor'] for event in events], dtype=float)
+    guests = np.array([event['guests'] for event in events], dtype=float)
+    price = np.array([event['ticket_price'] for event in events], dtype=float)
+
+    usable = (marketing_cost > 0) & (fame > 0) & (guests > 0)
+    if usable.sum() < 2 or np.ptp(price[usable]) == 0:
+        raise ValueError("calibration needs at least two events with positive guests and marketing and different ticket prices")
+
+    y = np.log(guests[usable] / (marketing_cost[usable] * fame[usable]))
+    design = np.column_stack([np.ones(usable.sum()), -price[usable]])
+    (log_effectiveness, k), *_ = np.linalg.lstsq(design, y, rcond=None)
+    residuals = y - design @ np.array([log_effectiveness, k])
+
+    result = {
+        'k': float(k),
+        'marketing_effectiveness': float(np.exp(log_effectiveness)),
+        'rmse_log': float(np.sqrt(np.mean(residuals ** 2))),
+        'events': int(usable.sum()),
+    }
+    if fit_fame:
+        # Известность каждого мероприятия поглощает его остаток относительно общей кривой
+        fitted = fame.copy()
+        fitted[usable] = fame[usable] * np.exp(residuals)
+        result['fame_factors'] = {name: float(value) for name, value, ok in zip(names, fitted, usable) if ok}
+    return result
+
+
+def calibrate(events, fit_fame=False, cache_dir=None):
+    # Параметры пересчитываются только при изменении истории: результат лежит на диске под хэшем набора данных
+    events = list(events)
+    key = dataset_hash(events, fit_fame)
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    path = os.path.join(cache_dir, f'calibration-{key}.json')
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    result = fit_demand(events, fit_fame)
+    result['dataset_hash'] = key
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return result
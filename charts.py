@@ -0,0 +1,248 @@
+# plotly и pandas импортируются внутри функций: модуль можно импортировать без них,
+# а их загрузка происходит только при первой отрисовке графика.
+import numpy as np
+
+COLORS = {'Neuropunk': 'yellow', 'Bass Vibration IV': 'green', 'Hardline I': '#ff005e', 'New': '#ff00ff'}
+HISTORY_COLOR = '#00ffcc'
+LABEL_THRESHOLD = 40
+BINNING_THRESHOLD = 2000
+BIN_GRID = 60
+# Прежний шаг сетки (100 гостей, 500₽) сохраняется, пока линий на оси не больше MAX_GRID_LINES
+MAX_GRID_LINES = 50
+
+
+def _comparison_color(name):
+    return COLORS['New'] if name.startswith('New') else COLORS.get(name, '#ff00ff')
+
+
+def _bin_points(guests, price, grid):
+    # Точки сводятся в ячейки сетки grid × grid по диапазону данных: на ячейку — средние координаты
+    # и число мероприятий, поэтому размер фигуры не больше grid² точек при любом объёме истории
+    def cell(values):
+        low, high = values.min(), values.max()
+        return np.minimum(((values - low) / (high - low if high > low else 1) * grid).astype(np.int64), grid - 1)
+
+    cells, inverse, counts = np.unique(cell(guests) * grid + cell(price), return_inverse=True, return_counts=True)
+    return (np.bincount(inverse, guests) / counts, np.bincount(inverse, price) / counts, counts)
+
+
+def _minor_grid(values, step):
+    if values.size == 0 or np.nanmax(values) / step > MAX_GRID_LINES:
+        return None
+    return dict(dtick=step, showgrid=True, gridcolor='#262626', gridwidth=1)
+
+
+def build_comparison_figure(points, selected=None, highlight=None):
+    import plotly.graph_objects as go
+
+    # points — кортежи (мероприятие, бюджет, количество гостей, стоимость входа); selected — имена
+    # показываемых точек (None — все); highlight — текущее мероприятие, оно подписано в любом режиме.
+    # Фигура строится из целых столбцов: до LABEL_THRESHOLD точек — подписи и перекрестья у каждой,
+    # больше — один трейс WebGL, больше BINNING_THRESHOLD — ячейки сетки вместо отдельных точек.
+    names = [point[0] for point in points]
+    guests = np.array([point[2] for point in points], dtype=float)
+    price = np.array([point[3] for point in points], dtype=float)
+    if selected is not None:
+        selected = set(selected)
+        shown = np.fromiter((name in selected for name in names), dtype=bool, count=len(names))
+        names = [name for name, keep in zip(names, shown) if keep]
+        guests, price = guests[shown], price[shown]
+
+    labelled = len(names) <= LABEL_THRESHOLD
+    marked = [i for i, name in enumerate(names) if labelled or name == highlight]
+
+    # Перекрестья — один пунктирный трейс с разрывами None вместо двух shape на мероприятие
+    crosshair_x, crosshair_y = [], []
+    for i in marked:
+        crosshair_x += [guests[i], guests[i], None, 0, guests[i], None]
+        crosshair_y += [0, price[i], None, price[i], price[i], None]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=crosshair_x, y=crosshair_y, mode='lines',
+        line=dict(color='#555555', dash="dash", width=1),
+        hoverinfo='skip', showlegend=False
+    ))
+    if not labelled and len(names) > BINNING_THRESHOLD:
+        x, y, counts = _bin_points(guests, price, BIN_GRID)
+        fig.add_trace(go.Scattergl(
+            x=x, y=y, mode='markers', customdata=counts,
+            marker=dict(size=np.clip(4 + 2 * np.sqrt(counts), 4, 24), color=HISTORY_COLOR, opacity=0.7),
+            hovertemplate="Мероприятий: %{customdata}<br>Гостей ≈ %{x:,.0f}<br>Цена ≈ %{y:,.0f}₽<extra></extra>",
+            showlegend=False
+        ))
+    elif not labelled:
+        fig.add_trace(go.Scattergl(
+            x=guests, y=price, mode='markers', text=names,
+            marker=dict(size=8, color=[COLORS.get(name, HISTORY_COLOR) for name in names], opacity=0.8),
+            hovertemplate="%{text}<br>Гостей: %{x:,.0f}<br>Цена: %{y:,.0f}₽<extra></extra>",
+            showlegend=False
+        ))
+    if marked:
+        fig.add_trace(go.Scatter(
+            x=guests[marked], y=price[marked], mode='markers+text',
+            text=[names[i] for i in marked],
+            marker=dict(size=15, color=[_comparison_color(names[i]) for i in marked], opacity=1),
+            textposition='top center',
+            textfont=dict(color='white', size=12),
+            hovertemplate="%{text}<br>Гостей: %{x:,.0f}<br>Цена: %{y:,.0f}₽<extra></extra>",
+            showlegend=False
+        ))
+
+    # Сетка — встроенная сетка осей: размер фигуры не зависит от количества гостей. Подписанные деления
+    # всегда подбирает plotly, чтобы подписи не налезали друг на друга при широком диапазоне; мелкая
+    # сетка с прежним шагом добавляется, только если линий получается немного
+    grid = dict(showgrid=True, gridcolor='#333333', gridwidth=1, zeroline=False, rangemode='tozero')
+    fig.update_xaxes(minor=_minor_grid(guests, 100) if labelled else None, **grid)
+    fig.update_yaxes(minor=_minor_grid(price, 500) if labelled else None, **grid)
+
+    fig.update_layout(
+        xaxis_title="Количество гостей",
+        yaxis_title="Усреднённая стоимость билета (₽)",
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12),
+        height=500,
+        width=None,
+        margin=dict(l=10, r=10, t=10, b=30)
+    )
+    return fig
+
+
+def build_price_surface_figure(surface, first_tier="Этап 1", last_tier="На входе"):
+    import plotly.graph_objects as go
+
+    # Лучшее значение по ценам промежуточных уровней для каждой пары (цена первого уровня, цена последнего)
+    axis, values = surface['axis'], surface['values']
+    fig = go.Figure(go.Heatmap(x=axis, y=axis, z=values.max(axis=tuple(range(1, values.ndim - 1))).T, colorscale='Magma'))
+    fig.update_layout(
+        xaxis_title=f"Цена {first_tier}", yaxis_title=f"Цена {last_tier}",
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=300, margin=dict(l=10, r=10, t=10, b=30)
+    )
+    return fig
+
+
+SENSITIVITY_LABELS = {
+    'marketing_percent': "Маркетинг (%)", 'free_tickets': "Free", 'risk_amount': "Расходы",
+    'tier_price': "Цена", 'tier_limit': "Количество",
+}
+
+
+def sensitivity_label(row):
+    label = SENSITIVITY_LABELS.get(row['input'], row['input'])
+    return label if row['tier'] is None else f"{label} {row['tier_name']}"
+
+
+def build_tornado_figure(sensitivity):
+    import plotly.graph_objects as go
+
+    # Самые влиятельные входы сверху: строки уже отсортированы по размаху
+    rows = sensitivity['inputs'][::-1]
+    labels = [sensitivity_label(row) for row in rows]
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=labels, x=[row['low'] for row in rows], base=sensitivity['base'], orientation='h', name="Уменьшение",
+        marker_color='#00ffcc', customdata=[row['low_input'] for row in rows],
+        hovertemplate="%{y} = %{customdata}<br>%{x:+,.0f}₽<extra></extra>"
+    ))
+    fig.add_trace(go.Bar(
+        y=labels, x=[row['high'] for row in rows], base=sensitivity['base'], orientation='h', name="Увеличение",
+        marker_color='#ff005e', customdata=[row['high_input'] for row in rows],
+        hovertemplate="%{y} = %{customdata}<br>%{x:+,.0f}₽<extra></extra>"
+    ))
+    fig.update_layout(
+        barmode='overlay', xaxis_title="Чистая прибыль (₽)",
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=400, margin=dict(l=10, r=10, t=10, b=30),
+        legend=dict(orientation='h', y=1.05)
+    )
+    return fig
+
+
+TIER_COLORS = ('#ffcc00', '#00ffcc', '#ff005e', '#66aaff', '#ff9933', '#99ff66', '#cc66ff', '#aaaaaa')
+
+
+def build_presale_figure(timeline):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=timeline['day'], y=timeline['cash'], mode='lines', name="Выручка (₽)",
+        line=dict(color='#ff00ff', width=3)
+    ))
+    for i, (name, sales) in enumerate(zip(timeline['tiers'], timeline['stage_sales'])):
+        color = '#aaaaaa' if i == len(timeline['tiers']) - 1 else TIER_COLORS[i % (len(TIER_COLORS) - 1)]
+        fig.add_trace(go.Scatter(
+            x=timeline['day'], y=sales, mode='lines', name=name,
+            line=dict(color=color, width=1, shape='hv'), yaxis='y2'
+        ))
+    fig.update_layout(
+        xaxis_title="Дней до мероприятия",
+        yaxis=dict(title="Накопленная выручка (₽)", gridcolor='#333333'),
+        yaxis2=dict(title="Продано билетов", overlaying='y', side='right', showgrid=False),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=350, margin=dict(l=10, r=10, t=10, b=30),
+        legend=dict(orientation='h', y=1.1)
+    )
+    return fig
+
+
+def build_scenario_figure(results):
+    import plotly.graph_objects as go
+
+    # results — {сценарий: результат прогноза}; выручка и прибыль столбцами, гости — точками на второй оси
+    names = list(results)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=names, y=[results[name]['ticket_revenue'] for name in names], name="Выручка от билетов (₽)",
+                         marker_color='#00ffcc'))
+    fig.add_trace(go.Bar(x=names, y=[results[name]['net_profit'] for name in names], name="Чистая прибыль (₽)",
+                         marker_color='#ff005e'))
+    fig.add_trace(go.Scatter(x=names, y=[results[name]['total_attendance'] for name in names], name="Гости",
+                             mode='markers', marker=dict(size=12, color='#ffcc00'), yaxis='y2'))
+    fig.update_layout(
+        barmode='group',
+        yaxis=dict(title="₽", gridcolor='#333333'),
+        yaxis2=dict(title="Гости", overlaying='y', side='right', showgrid=False, rangemode='tozero'),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=400, margin=dict(l=10, r=10, t=10, b=30),
+        legend=dict(orientation='h', y=1.1)
+    )
+    return fig
+
+
+def build_queue_figure(profile):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=profile['minute'], y=profile['p90'], mode='lines', name="P90",
+                             line=dict(color='#ff005e', width=1), fill=None))
+    fig.add_trace(go.Scatter(x=profile['minute'], y=profile['p50'], mode='lines', name="Медиана",
+                             line=dict(color='#00ffcc', width=3)))
+    fig.update_layout(
+        xaxis_title="Минут после открытия дверей", yaxis_title="Гостей в очереди",
+        xaxis=dict(gridcolor='#333333'), yaxis=dict(gridcolor='#333333', rangemode='tozero'),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=300, margin=dict(l=10, r=10, t=10, b=30),
+        legend=dict(orientation='h', y=1.1)
+    )
+    return fig
+
+
+def build_histogram_figure(histogram, label, bars=64):
+    import plotly.graph_objects as go
+
+    # Сводка result_store считает тонкую гистограмму; для графика соседние корзины складываются
+    edges, counts = histogram['edges'], histogram['counts']
+    group = max(1, counts.size // bars)
+    usable = counts.size - counts.size % group
+    counts = counts[:usable].reshape(-1, group).sum(axis=1)
+    edges = edges[:usable + 1:group]
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges), marker_color='#00ffcc'))
+    fig.update_layout(
+        xaxis_title=label, yaxis_title="Строк",
+        xaxis=dict(gridcolor='#333333'), yaxis=dict(gridcolor='#333333'),
+        plot_bgcolor='rgba(0,0,0,0)', paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white', size=12), height=300, margin=dict(l=10, r=10, t=10, b=30),
+    )
+    return fig
@@ -0,0 +1,241 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+from forecast import PRE_SALE_FIELDS
+
+DEFAULT_DB_PATH = os.environ.get('FFP_EVENTS_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.db'))
+
+EVENT_FIELDS = ('name', 'event_date', 'budget', 'guests', 'ticket_price', 'marketing_percent', 'fame_factor',
+                'risk_amount', 'free_tickets') + PRE_SALE_FIELDS
+INTEGER_FIELDS = ('guests', 'free_tickets') + PRE_SALE_FIELDS
+NUMERIC_FIELDS = ('budget', 'ticket_price', 'marketing_percent', 'fame_factor', 'risk_amount') + INTEGER_FIELDS
+# NOT NULL без значения по умолчанию: без них новое событие не вставить
+REQUIRED_FIELDS = ('budget', 'guests', 'ticket_price')
+
+SEED_EVENTS = (
+    {'name': 'Neuropunk', 'event_date': None, 'budget': 500000, 'guests': 500, 'ticket_price': 2000, 'marketing_percent': 0.2,
+     'fame_factor': 10.15, 'risk_amount': 0, 'free_tickets': 20,
+     'stage1_price': 1000, 'stage1_limit': 100, 'stage2_price': 1200, 'stage2_limit': 100,
+     'stage3_price': 1400, 'stage3_limit': 100, 'door_price': 1800, 'door_limit': 999},
+    {'name': 'Bass Vibration IV', 'event_date': None, 'budget': 113500, 'guests': 110, 'ticket_price': 1200, 'marketing_percent': 0.2,
+     'fame_factor': 1.0, 'risk_amount': 96000, 'free_tickets': 35,
+     'stage1_price': 900, 'stage1_limit': 21, 'stage2_price': 1100, 'stage2_limit': 31,
+     'stage3_price': 1500, 'stage3_limit': 21, 'door_price': 1000, 'door_limit': 0},
+    {'name': 'Hardline I', 'event_date': None, 'budget': 120000, 'guests': 140, 'ticket_price': 940, 'marketing_percent': 0.2,
+     'fame_factor': 1.0, 'risk_amount': 25000, 'free_tickets': 21,
+     'stage1_price': 400, 'stage1_limit': 100, 'stage2_price': 400, 'stage2_limit': 100,
+     'stage3_price': 700, 'stage3_limit': 50, 'door_price': 1000, 'door_limit': 849},
+)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    event_date TEXT,
+    budget NUMERIC NOT NULL,
+    guests INTEGER NOT NULL,
+    ticket_price NUMERIC NOT NULL,
+    marketing_percent REAL NOT NULL DEFAULT 0.2,
+    fame_factor REAL NOT NULL DEFAULT 1.0,
+    risk_amount NUMERIC NOT NULL DEFAULT 0,
+    free_tickets INTEGER NOT NULL DEFAULT 0,
+    {', '.join(f'{field} INTEGER' for field in PRE_SALE_FIELDS)},
+    updated_seq INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_date ON events(event_date);
+CREATE INDEX IF NOT EXISTS idx_events_budget ON events(budget);
+CREATE INDEX IF NOT EXISTS idx_events_updated_seq ON events(updated_seq);
+"""
+
+_initialized = set()
+_initialized_lock = threading.Lock()
+
+
+def connect(path=None):
+    path = path or DEFAULT_DB_PATH
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    # Схема и начальные данные — один раз на файл в процессе, а не при каждом перезапуске страницы
+    with _initialized_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            if conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 0:
+                upsert_events(conn, SEED_EVENTS)
+            _initialized.add(path)
+    return conn
+
+
+def _normalize(event):
+    # {поле: значение} только для заполненных полей события
+    row = {}
+    for field in EVENT_FIELDS:
+        value = event.get(field)
+        if value in ('', None):
+            continue
+        if field in NUMERIC_FIELDS:
+            # Целые суммы храним целыми: st.number_input не смешивает int и float
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"event {event.get('name')!r}: {field} must be a number, got {value!r}") from None
+            if field in INTEGER_FIELDS or value.is_integer():
+                value = int(value)
+        row[field] = value
+    return row
+
+
+def _write_batch(conn, rows):
+    # rows — [(поля события, updated_seq)]. Новые события вставляются только с переданными полями, остальные
+    # получают значения по умолчанию из схемы; у существующих обновляются только переданные поля. Через
+    # INSERT ... ON CONFLICT так нельзя: NOT NULL проверяется до разрешения конфликта. Записи идут строго
+    # в порядке пакета: подряд идущие строки одного вида и с одним набором полей — одним executemany
+    names = list({row['name'] for row, _ in rows})
+    existing = {
+        name for (name,) in conn.execute(f"SELECT name FROM events WHERE name IN ({', '.join('?' * len(names))})", names)
+    }
+    group, values = None, []
+    for row, seq in rows:
+        fields = tuple(row)
+        if row['name'] in existing:
+            key = ('update', fields)
+            value = [row[field] for field in fields if field != 'name'] + [seq, row['name']]
+        else:
+            missing = [field for field in REQUIRED_FIELDS if field not in row]
+            if missing:
+                raise ValueError(f"new event {row['name']!r} is missing required fields: {', '.join(missing)}")
+            existing.add(row['name'])
+            key = ('insert', fields)
+            value = list(row.values()) + [seq]
+        if key != group:
+            _execute_group(conn, group, values)
+            group, values = key, []
+        values.append(value)
+    _execute_group(conn, group, values)
+
+
+def _execute_group(conn, group, values):
+    if not values:
+        return
+    kind, fields = group
+    if kind == 'insert':
+        sql = f"INSERT INTO events ({', '.join(fields)}, updated_seq) VALUES ({', '.join('?' * (len(fields) + 1))})"
+    else:
+        sql = f"UPDATE events SET {''.join(f'{field} = ?, ' for field in fields if field != 'name')}updated_seq = ? WHERE name = ?"
+    conn.executemany(sql, values)
+
+
+def upsert_events(conn, events, batch_size=1000):
+    # Каждая запись получает новый updated_seq: по нему refresh_catalog догружает только изменения.
+    # BEGIN IMMEDIATE берёт блокировку записи до чтения MAX(updated_seq): иначе два импорта (CLI и
+    # приложение) выдали бы одинаковые номера, и refresh_catalog навсегда пропустил бы часть записей
+    count = 0
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        seq = conn.execute("SELECT COALESCE(MAX(updated_seq), 0) FROM events").fetchone()[0]
+        batch = []
+        for event in events:
+            row = _normalize(event)
+            if 'name' not in row:
+                raise ValueError(f"event {event!r} has no name")
+            seq += 1
+            batch.append((row, seq))
+            if len(batch) >= batch_size:
+                _write_batch(conn, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            _write_batch(conn, batch)
+            count += len(batch)
+    return count
+
+
+def import_csv(conn, path, batch_size=1000):
+    with open(path, newline='', encoding='utf-8') as f:
+        return upsert_events(conn, csv.DictReader(f), batch_size)
+
+
+def iter_events(conn, name=None, date_from=None, date_to=None, budget_min=None, budget_max=None, batch_size=500):
+    conditions, params = [], []
+    if name:
+        conditions.append("name LIKE ?")
+        params.append(f'%{name}%')
+    if date_from:
+        conditions.append("event_date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("event_date <= ?")
+        params.append(date_to)
+    if budget_min is not None:
+        conditions.append("budget >= ?")
+        params.append(budget_min)
+    if budget_max is not None:
+        conditions.append("budget <= ?")
+        params.append(budget_max)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    cursor = conn.execute(f"SELECT * FROM events {where} ORDER BY id", params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            yield dict(row)
+
+
+def new_catalog(path=None):
+    return {'path': path or DEFAULT_DB_PATH, 'last_seq': 0, 'events': {}, 'lock': threading.Lock()}
+
+
+def refresh_catalog(catalog, batch_size=500):
+    # Догружает в кэш процесса только записи, изменённые после последнего обновления
+    with catalog['lock'], closing(connect(catalog['path'])) as conn:
+        cursor = conn.execute("SELECT * FROM events WHERE updated_seq > ? ORDER BY updated_seq", (catalog['last_seq'],))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                catalog['events'][row['name']] = dict(row)
+                catalog['last_seq'] = row['updated_seq']
+    return catalog['events']
+
+
+def query_event_names(catalog, **filters):
+    with closing(connect(catalog['path'])) as conn:
+        return [event['name'] for event in iter_events(conn, **filters)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Каталог прошедших мероприятий")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    import_parser = subparsers.add_parser('import', help="импорт мероприятий из CSV")
+    import_parser.add_argument('csv_path')
+    list_parser = subparsers.add_parser('list', help="список мероприятий")
+    list_parser.add_argument('--name')
+    list_parser.add_argument('--date-from')
+    list_parser.add_argument('--date-to')
+    list_parser.add_argument('--budget-min', type=float)
+    list_parser.add_argument('--budget-max', type=float)
+    args = parser.parse_args(argv)
+
+    with closing(connect(args.db)) as conn:
+        if args.command == 'import':
+            try:
+                print(f"Импортировано: {import_csv(conn, args.csv_path)}")
+            except (ValueError, OSError) as e:
+                parser.exit(2, f"error: {e}\n")
+        else:
+            events = iter_events(conn, args.name, args.date_from, args.date_to, args.budget_min, args.budget_max)
+            writer = csv.DictWriter(sys.stdout, fieldnames=EVENT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(events)
+
+
+if __name__ == "__main__":
+    main()
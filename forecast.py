@@ -0,0 +1,308 @@
+import math
+
+import numpy as np
+
+STAGES = ('stage1', 'stage2', 'stage3', 'door')
+STAGE_NAMES = {'stage1': 'Этап 1', 'stage2': 'Этап 2', 'stage3': 'Этап 3', 'door': 'На входе'}
+K = 0.0038
+SOLVER_TOLERANCE = 1e-3
+MAX_SOLVER_ITERATIONS = 50
+
+
+def _ordered_sum(values):
+    # cumsum складывает слагаемые строго по порядку уровней, как прежняя цепочка w1 * p1 + w2 * p2 + ...
+    if values.shape[-1] == 0:
+        return np.zeros(values.shape[:-1])
+    return np.cumsum(values, axis=-1)[..., -1]
+
+
+def allocate_tiers(estimated_guests, limits):
+    # Гости заполняют уровни по порядку. Число полностью распроданных уровней — searchsorted по
+    # накопленным лимитам, остаток уходит в следующий уровень. Строки сдвинуты на (наибольшая
+    # сумма лимитов + 1), поэтому один searchsorted по плоскому массиву обрабатывает все сценарии.
+    estimated_guests = np.asarray(estimated_guests)
+    limits = np.broadcast_to(limits, estimated_guests.shape + np.shape(limits)[-1:])
+    n_tiers = limits.shape[-1]
+    if n_tiers == 0 or estimated_guests.size == 0:
+        return np.zeros(limits.shape, dtype=np.int64)
+
+    cumulative = np.cumsum(limits, axis=-1)
+    flat = cumulative.reshape(-1, n_tiers)
+    rows = np.arange(flat.shape[0])
+    offsets = rows * (flat[:, -1].max() + 1)
+    sold_out = np.searchsorted((flat + offsets[:, None]).ravel(), estimated_guests.ravel() + offsets, side='right')
+    sold_out = (sold_out - rows * n_tiers).reshape(estimated_guests.shape + (1,))
+
+    tier = np.arange(n_tiers)
+    remainder = estimated_guests[..., None] - (cumulative - limits)
+    return np.where(tier < sold_out, limits, np.where(tier == sold_out, remainder, 0))
+
+
+def _realized_price(guests, prices, limits, previous):
+    # Средняя и предельная цена билета при нецелом числе гостей guests (строки — сценарии)
+    sold = np.clip(guests[:, None] - previous, 0, limits)
+    revenue = _ordered_sum(sold * prices)
+    current = (guests[:, None] > previous) & (guests[:, None] <= previous + limits)
+    marginal = np.where(current, prices, 0).sum(axis=-1)
+    first = np.take_along_axis(prices, np.argmax(limits > 0, axis=-1)[:, None], axis=-1)[:, 0]
+    average = np.where(guests > 0, revenue / np.where(guests > 0, guests, 1), first)
+    return average, marginal
+
+
+def solve_equilibrium(prices, limits, marketing_guests, k=K, tol=SOLVER_TOLERANCE, max_iterations=MAX_SOLVER_ITERATIONS):
+    # Равновесие спроса и цены: g = min(всего билетов, marketing_guests * exp(-k * средняя_цена(g))),
+    # где средняя цена — фактическая при продаже g билетов по уровням. Корень h(g) = g - спрос(g)
+    # лежит в [0, всего билетов] (h(0) <= 0 <= h(всего)); шаг Ньютона, а если он выходит из
+    # текущей вилки — деление пополам. Сходимость проверяется для всех сценариев сразу, дальше
+    # считаются только несошедшиеся строки. Возвращает g (нецелое) и число итераций по сценариям.
+    prices, limits = np.asarray(prices, dtype=float), np.asarray(limits, dtype=float)
+    shape = np.broadcast_shapes(prices.shape[:-1], limits.shape[:-1], np.shape(marketing_guests), np.shape(k))
+    tiers = np.broadcast_shapes(prices.shape[-1:], limits.shape[-1:])
+    prices = np.broadcast_to(prices, shape + tiers).reshape(-1, tiers[0])
+    limits = np.broadcast_to(limits, shape + tiers).reshape(-1, tiers[0])
+    marketing_guests = np.broadcast_to(marketing_guests, shape).astype(float).ravel()
+    k = np.broadcast_to(k, shape).astype(float).ravel()
+
+    previous = np.cumsum(limits, axis=-1) - limits
+    total = limits.sum(axis=-1)
+    weighted_price = _ordered_sum(limits / np.where(total > 0, total, 1)[:, None] * prices)
+    guests = np.clip(marketing_guests * np.exp(-k * weighted_price), 0, total)
+    low, high = np.zeros_like(total), total.copy()
+    previous_step = total.copy()
+    iterations = np.zeros(total.shape, dtype=np.int64)
+
+    active = np.flatnonzero(total > 0)
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        g = guests[active]
+        average, marginal = _realized_price(g, prices[active], limits[active], previous[active])
+        demand = marketing_guests[active] * np.exp(-k[active] * average)
+        capped = demand >= total[active]
+        residual = g - np.where(capped, total[active], demand)
+        iterations[active] += 1
+
+        low[active] = np.where(residual < 0, g, low[active])
+        high[active] = np.where(residual > 0, g, high[active])
+        # d(средняя цена)/dg = (предельная - средняя) / g
+        slope = 1 + np.where(capped | (g <= 0), 0.0, k[active] * demand * (marginal - average) / np.where(g > 0, g, 1))
+        newton = g - residual / np.where(slope != 0, slope, 1)
+        # На изломах кривой цены шаг Ньютона может зациклиться: если он выходит из вилки или
+        # уменьшается медленнее чем вдвое, делим вилку пополам
+        bisect = ((slope <= 0) | (newton <= low[active]) | (newton >= high[active])
+                  | (np.abs(2 * residual) > np.abs(previous_step[active] * slope)))
+        step = np.where(bisect, (low[active] + high[active]) / 2, newton)
+        previous_step[active] = np.abs(step - g)
+        converged = (np.abs(residual) <= tol) | (high[active] - low[active] <= tol)
+        guests[active] = np.where(converged, g, step)
+        active = active[~converged]
+
+    return guests.reshape(shape), iterations.reshape(shape)
+
+
+def calculate_tiers_batch(prices, limits, marketing_guests, max_iterations=MAX_SOLVER_ITERATIONS, k=K, tol=SOLVER_TOLERANCE):
+    # prices и limits — массивы с осью уровней последней (..., N); остальные оси и marketing_guests
+    # транслируются между собой, каждый элемент — отдельный сценарий. Уровни с нулевым лимитом
+    # ни на что не влияют, поэтому сценарии с разным числом уровней можно дополнять ими до общей формы.
+    prices = np.asarray(prices)
+    limits = np.asarray(limits)
+    marketing_guests = np.asarray(marketing_guests, dtype=float)
+    shape = np.broadcast_shapes(prices.shape[:-1], limits.shape[:-1], marketing_guests.shape, np.shape(k))
+    tiers = np.broadcast_shapes(prices.shape[-1:], limits.shape[-1:])
+    prices = np.broadcast_to(prices, shape + tiers)
+    limits = np.broadcast_to(limits, shape + tiers)
+    total_tickets_available = limits.sum(axis=-1)
+    if tiers[0] == 0:
+        return (np.zeros(shape, dtype=np.int64), np.zeros(shape + tiers, dtype=np.int64), np.zeros(shape),
+                np.zeros(shape), np.zeros(shape, dtype=np.int64))
+
+    guests, iterations = solve_equilibrium(prices, limits, marketing_guests, k, tol, max_iterations)
+    # np.rint, как и встроенный round, округляет половины к чётному
+    estimated_guests = np.minimum(total_tickets_available, np.rint(guests)).astype(np.int64)
+    tier_sales = allocate_tiers(estimated_guests, limits)
+    sold_tickets = tier_sales.sum(axis=-1)
+    ticket_revenue = _ordered_sum(tier_sales * prices)
+    # Без проданных билетов средняя цена — цена первого доступного уровня, её и видит первый гость
+    first_price = np.take_along_axis(prices, np.argmax(limits > 0, axis=-1)[..., None], axis=-1)[..., 0]
+    avg_ticket_price = np.where(sold_tickets > 0, ticket_revenue / np.where(sold_tickets > 0, sold_tickets, 1), first_price)
+    avg_ticket_price = np.where(total_tickets_available > 0, avg_ticket_price, 0.0)
+
+    return estimated_guests, tier_sales, avg_ticket_price, ticket_revenue, iterations
+
+
+def stage_arrays(pre_sale):
+    # Четыре фиксированных этапа (поля CSV, API и каталога) -> массивы цен и лимитов с осью уровней последней
+    prices = np.stack(np.broadcast_arrays(*(np.asarray(pre_sale[f'{stage}_price']) for stage in STAGES)), axis=-1)
+    limits = np.stack(np.broadcast_arrays(*(np.asarray(pre_sale[f'{stage}_limit']) for stage in STAGES)), axis=-1)
+    return prices, limits
+
+
+def stage_tiers(pre_sale):
+    return [{'name': STAGE_NAMES[stage], 'price': pre_sale[f'{stage}_price'], 'limit': pre_sale[f'{stage}_limit']}
+            for stage in STAGES]
+
+
+def tier_arrays(tiers):
+    # Список уровней [{'name', 'price', 'limit'}, ...] -> массивы цен и лимитов; последний уровень — продажа на входе
+    prices = np.array([tier['price'] for tier in tiers])
+    limits = np.array([tier['limit'] for tier in tiers], dtype=np.int64)
+    return prices, limits
+
+
+def calculate_guests_and_price_batch(stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
+                                     door_price, door_limit, marketing_guests, free_tickets, fame_factor=None,
+                                     max_iterations=MAX_SOLVER_ITERATIONS, k=K):
+    # Прежний интерфейс с четырьмя этапами поверх calculate_tiers_batch
+    prices, limits = stage_arrays({
+        'stage1_price': stage1_price, 'stage1_limit': stage1_limit, 'stage2_price': stage2_price, 'stage2_limit': stage2_limit,
+        'stage3_price': stage3_price, 'stage3_limit': stage3_limit, 'door_price': door_price, 'door_limit': door_limit,
+    })
+    marketing_guests = np.broadcast_to(marketing_guests, np.broadcast_shapes(np.shape(marketing_guests), np.shape(free_tickets)))
+    estimated_guests, tier_sales, avg_ticket_price, ticket_revenue, _ = calculate_tiers_batch(
+        prices, limits, marketing_guests, max_iterations, k
+    )
+    ticket_sales = dict(zip(STAGES, np.moveaxis(tier_sales, -1, 0)))
+    return estimated_guests, ticket_sales, avg_ticket_price, ticket_revenue
+
+
+def calculate_guests_and_price(stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
+                               door_price, door_limit, marketing_guests, free_tickets, fame_factor,
+                               max_iterations=MAX_SOLVER_ITERATIONS):
+    estimated_guests, ticket_sales, avg_ticket_price, ticket_revenue = calculate_guests_and_price_batch(
+        stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
+        door_price, door_limit, marketing_guests, free_tickets, fame_factor, max_iterations
+    )
+    ticket_sales = {stage: sales.item() for stage, sales in ticket_sales.items()}
+    return estimated_guests.item(), ticket_sales, avg_ticket_price.item(), ticket_revenue.item()
+
+
+MARKETING_EFFECTIVENESS = 0.2685
+MIN_FAME, MAX_FAME = 1.0, 10.15
+MIN_MARKETING, MAX_MARKETING = 22700, 100000
+BAR_REVENUE_PER_GUEST = 1300
+
+PRE_SALE_FIELDS = tuple(f'{stage}_{field}' for stage in STAGES for field in ('price', 'limit'))
+REQUIRED_FIELDS = ('budget', 'marketing_percent') + PRE_SALE_FIELDS
+OPTIONAL_FIELDS = {'risk_amount': 0.0, 'free_tickets': 0.0, 'fame_factor': np.nan}
+INTEGER_FIELDS = ('free_tickets',) + tuple(f'{stage}_limit' for stage in STAGES)
+RESULT_FIELDS = ('estimated_guests',) + tuple(f'{stage}_sales' for stage in STAGES) + (
+    'avg_ticket_price', 'ticket_revenue', 'total_attendance', 'marketing_cost', 'fame_factor',
+    'profit', 'net_profit', 'bar_revenue', 'remaining_budget', 'solver_iterations')
+
+
+def fame_factor_for(marketing_cost):
+    share = np.clip((np.asarray(marketing_cost) - MIN_MARKETING) / (MAX_MARKETING - MIN_MARKETING), 0.0, 1.0)
+    return MIN_FAME + (MAX_FAME - MIN_FAME) * share
+
+
+def forecast_batch(budget, marketing_percent, risk_amount, free_tickets, prices, limits, fame_factor=None,
+                   k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS):
+    # prices и limits — массивы уровней (ось уровней последняя), остальные аргументы могут быть массивами сценариев.
+    budget = np.asarray(budget)
+    risk_amount = np.asarray(risk_amount)
+    free_tickets = np.asarray(free_tickets)
+    marketing_cost = budget * np.asarray(marketing_percent)
+    if fame_factor is None:
+        fame_factor = fame_factor_for(marketing_cost)
+    marketing_guests = marketing_cost * np.asarray(marketing_effectiveness) * np.asarray(fame_factor)
+
+    estimated_guests, tier_sales, avg_ticket_price, ticket_revenue, solver_iterations = calculate_tiers_batch(
+        prices, limits, np.broadcast_to(marketing_guests, np.broadcast_shapes(marketing_guests.shape, free_tickets.shape)), k=k
+    )
+
+    total_attendance = estimated_guests + free_tickets
+    profit = budget - risk_amount - marketing_cost + ticket_revenue
+    return {
+        'marketing_cost': marketing_cost,
+        'fame_factor': np.asarray(fame_factor),
+        'marketing_guests': marketing_guests,
+        'estimated_guests': estimated_guests,
+        'tier_sales': tier_sales,
+        'avg_ticket_price': avg_ticket_price,
+        'ticket_revenue': ticket_revenue,
+        'total_attendance': total_attendance,
+        'profit': profit,
+        'bar_revenue': total_attendance * BAR_REVENUE_PER_GUEST,
+        'remaining_budget': budget - risk_amount - marketing_cost,
+        'net_profit': profit - risk_amount,
+        'solver_iterations': solver_iterations,
+    }
+
+
+def forecast_event(budget, marketing_percent, risk_amount, free_tickets, tiers, fame_factor=None,
+                   k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS):
+    # tiers — список уровней [{'name', 'price', 'limit'}, ...]; продажи по уровням возвращаются списком в том же порядке
+    prices, limits = tier_arrays(tiers)
+    result = forecast_batch(budget, marketing_percent, risk_amount, free_tickets, prices, limits, fame_factor,
+                            k, marketing_effectiveness)
+    return {name: value.tolist() if name == 'tier_sales' else value.item() for name, value in result.items()}
+
+
+def _column(rows, field, default=None):
+    values = []
+    for row in rows:
+        value = row.get(field)
+        if value in (None, ''):
+            if default is None:
+                raise ValueError(f"scenario {row!r} is missing required field {field!r}")
+            value = default
+        else:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"scenario {row!r}: field {field!r} must be a number, got {value!r}") from None
+            if not math.isfinite(value):
+                raise ValueError(f"scenario {row!r}: field {field!r} must be finite, got {value!r}")
+        values.append(value)
+    return np.asarray(values, dtype=float)
+
+
+def _check_ranges(rows, columns):
+    # Отрицательные цены и лимиты или доля маркетинга вне [0, 1] дали бы правдоподобный, но бессмысленный прогноз;
+    # лимиты приводятся к int64, поэтому дробные и не помещающиеся в int64 значения тоже отклоняются
+    checks = [(field, columns[field] >= 0, "must not be negative")
+              for field in ('budget',) + tuple(f'{stage}_price' for stage in STAGES)]
+    checks.append(('marketing_percent', (columns['marketing_percent'] >= 0) & (columns['marketing_percent'] <= 1),
+                   "must be between 0 and 1"))
+    for field in INTEGER_FIELDS:
+        values = columns[field]
+        checks.append((field, (values >= 0) & (values < float(2 ** 63)) & (values == np.floor(values)),
+                       "must be a non-negative integer"))
+    for field, valid, message in checks:
+        invalid = np.flatnonzero(~valid)
+        if invalid.size:
+            row = rows[invalid[0]]
+            raise ValueError(f"scenario {row!r}: field {field!r} {message}, got {row.get(field)!r}")
+
+
+def forecast_records(rows, k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS):
+    columns = {field: _column(rows, field) for field in REQUIRED_FIELDS}
+    columns.update({field: _column(rows, field, default) for field, default in OPTIONAL_FIELDS.items()})
+    _check_ranges(rows, columns)
+    for field in INTEGER_FIELDS:
+        columns[field] = columns[field].astype(np.int64)
+    fame_factor = columns['fame_factor']
+    fame_factor = np.where(np.isnan(fame_factor), fame_factor_for(columns['budget'] * columns['marketing_percent']), fame_factor)
+
+    result = forecast_batch(
+        columns['budget'], columns['marketing_percent'], columns['risk_amount'], columns['free_tickets'],
+        *stage_arrays(columns), fame_factor, k, marketing_effectiveness
+    )
+    for i, stage in enumerate(STAGES):
+        result[f'{stage}_sales'] = result['tier_sales'][:, i]
+    result['fame_factor'] = np.broadcast_to(result['fame_factor'], fame_factor.shape)
+    return {field: result[field].tolist() for field in RESULT_FIELDS}
+
+
+def comparison_points(events, free_tickets, current_event_name, display_event_name, budget, total_attendance, avg_ticket_price):
+    # Точки сравнительного графика: (мероприятие, бюджет за вычетом расходов, гости вместе с бесплатными, стоимость входа)
+    points = []
+    for event, values in events.items():
+        if event == current_event_name:
+            points.append((event, budget, total_attendance, avg_ticket_price))
+        else:
+            points.append((event, values['budget'] - values['risk_amount'],
+                           values['guests'] + free_tickets.get(event, 0), values['ticket_price']))
+    if current_event_name == 'New':
+        points.append((display_event_name, budget, total_attendance, avg_ticket_price))
+    return tuple(points)
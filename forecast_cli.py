@@ -0,0 +1,118 @@
+"""Пакетный прогноз без Streamlit: читает сценарии из CSV/JSONL частями и дописывает результаты по мере расчёта.
+
+    python forecast_cli.py scenarios.csv results.jsonl --chunk-size 10000
+    python forecast_cli.py sweep.csv results.arrow --chunk-size 100000
+
+Для .arrow/.feather и .parquet каждый чанк дописывается в столбцовый файл (нужен pyarrow), его читает
+result_store.py — в том числе файлы больше оперативной памяти.
+
+Поля сценария: budget, marketing_percent, stage1_price, stage1_limit, ..., door_price, door_limit;
+необязательные: risk_amount, free_tickets, fame_factor (по умолчанию — из маркетингового бюджета).
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, RESULT_FIELDS, forecast_records
+from result_store import ARROW_SUFFIXES, PARQUET_SUFFIXES, ResultWriter
+
+COLUMNAR_FORMATS = {'arrow': 'ipc', 'parquet': 'parquet'}
+
+
+def _format(path, explicit):
+    if explicit:
+        return explicit
+    if path.lower().endswith(ARROW_SUFFIXES):
+        return 'arrow'
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        return 'parquet'
+    return 'jsonl' if path.endswith(('.jsonl', '.json', '.ndjson')) else 'csv'
+
+
+def _typed_column(values):
+    # Поля сценария из CSV приходят строками: числовые столбцы пишутся числами, пустые значения — NaN
+    try:
+        return np.array([np.nan if value in (None, '') else float(value) for value in values])
+    except (TypeError, ValueError):
+        return np.array(['' if value is None else str(value) for value in values])
+
+
+def read_scenarios(f, fmt):
+    if fmt == 'csv':
+        return csv.DictReader(f)
+    return (json.loads(line) for line in f if line.strip())
+
+
+def run(source, sink, input_format, output_format, chunk_size, k, marketing_effectiveness):
+    scenarios = read_scenarios(source, input_format)
+    writer = None
+    total = 0
+    while True:
+        chunk = list(itertools.islice(scenarios, chunk_size))
+        if not chunk:
+            break
+        results = forecast_records(chunk, k, marketing_effectiveness)
+        total += len(chunk)
+        if isinstance(sink, ResultWriter):
+            columns = {field: _typed_column([row.get(field) for row in chunk]) for field in chunk[0] if field not in results}
+            columns.update(results)
+            sink.write(columns)
+            continue
+        if output_format == 'csv' and writer is None:
+            fieldnames = list(chunk[0].keys()) + [field for field in RESULT_FIELDS if field not in chunk[0]]
+            writer = csv.DictWriter(sink, fieldnames=fieldnames, extrasaction='ignore')
+            writer.writeheader()
+        for i, row in enumerate(chunk):
+            row = dict(row)
+            row.update((field, values[i]) for field, values in results.items())
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                sink.write(json.dumps(row, ensure_ascii=False) + '\n')
+        sink.flush()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетный прогноз гостей и выручки")
+    parser.add_argument('input', help="CSV или JSONL со сценариями, '-' — stdin")
+    parser.add_argument('output', nargs='?', default='-', help="файл результатов, '-' — stdout")
+    parser.add_argument('--input-format', choices=('csv', 'jsonl'))
+    parser.add_argument('--output-format', choices=('csv', 'jsonl') + tuple(COLUMNAR_FORMATS))
+    parser.add_argument('--chunk-size', type=int, default=10_000)
+    parser.add_argument('--k', type=float, default=K)
+    parser.add_argument('--marketing-effectiveness', type=float, default=MARKETING_EFFECTIVENESS)
+    args = parser.parse_args(argv)
+
+    input_format = _format(args.input, args.input_format)
+    output_format = _format(args.output, args.output_format)
+    if output_format in COLUMNAR_FORMATS and args.output == '-':
+        parser.exit(2, f"error: {output_format} output needs a file path\n")
+    source = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    if output_format in COLUMNAR_FORMATS:
+        sink = ResultWriter(args.output, COLUMNAR_FORMATS[output_format])
+    else:
+        sink = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        total = run(source, sink, input_format, output_format, args.chunk_size, args.k, args.marketing_effectiveness)
+    except BaseException as e:
+        # При любой ошибке, в том числе KeyboardInterrupt, недописанный файл не публикуется
+        if isinstance(sink, ResultWriter):
+            sink.abort()
+        if not isinstance(e, (ValueError, ImportError)):
+            raise
+        parser.exit(2, f"error: {e}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"Обработано сценариев: {total}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
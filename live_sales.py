@@ -0,0 +1,187 @@
+import csv
+import json
+import math
+import os
+from datetime import datetime
+
+import numpy as np
+
+from forecast import K, allocate_tiers, calculate_tiers_batch, tier_arrays
+
+PRIOR_GUESTS = 50.0
+Z_90 = 1.2815515655446004
+
+
+def _timestamp(value):
+    # Время продажи — секунды Unix (число или строка), строка ISO 8601 или datetime
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def _gamma_quantile(alpha, beta, z):
+    # Квантиль Gamma(alpha, beta) по приближению Уилсона — Хилферти, без scipy
+    c = 1 / (9 * alpha)
+    return alpha / beta * max(1 - c + z * c ** 0.5, 0.0) ** 3
+
+
+class SalesLog:
+    # Хвост журнала продаж: каждый read() возвращает только записи, дописанные с прошлого вызова.
+    # Неполная последняя строка остаётся до следующего чтения. Формат — по расширению: .csv с
+    # заголовком или JSONL; нечитаемые строки JSONL пропускаются и считаются в skipped. Если файл
+    # заменили или обрезали, чтение начинается заново и растёт generation.
+    def __init__(self, path):
+        self.path = path
+        self.csv = path.lower().endswith('.csv')
+        self.generation = 0
+        self.skipped = 0
+        self._offset = 0
+        self._inode = None
+        self._header = None
+
+    def read(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if self._inode is not None and (stat.st_ino != self._inode or stat.st_size < self._offset):
+            self._offset, self._header = 0, None
+            self.generation += 1
+        self._inode = stat.st_ino
+        if stat.st_size == self._offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(stat.st_size - self._offset)
+        end = chunk.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        self._offset += end
+        lines = chunk[:end].decode('utf-8-sig' if self._offset == end else 'utf-8').splitlines()
+        if not self.csv:
+            records = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    self.skipped += 1
+            return records
+        rows = csv.reader(lines)
+        if self._header is None:
+            self._header = next(rows, None)
+        return [dict(zip(self._header, row)) for row in rows if row]
+
+
+class LiveDemand:
+    # Продажи предпродажи — пуассоновский поток: к моменту t ожидается theta * D * s(t) билетов, где
+    # D — спрос базового прогноза, s(t) = ((t - начало продаж) / (начало мероприятия - начало продаж)) ** ramp —
+    # та же кривая, что в presale. Априорно theta ~ Gamma(prior_guests, prior_guests) со средним 1,
+    # после N билетов к моменту t — Gamma(prior_guests + N, prior_guests + D * s(t)). Запись меняет
+    # несколько чисел, поэтому обновление O(1); равновесие по уровням пересчитывается только в projection().
+    # После распродажи всех уровней предпродажи наблюдение цензурировано и D * s(t) больше не растёт.
+    def __init__(self, tiers, marketing_guests, sales_start, event_start, k=K, ramp=2.0, prior_guests=PRIOR_GUESTS):
+        self.sales_start = _timestamp(sales_start)
+        self.event_start = _timestamp(event_start)
+        if self.event_start <= self.sales_start:
+            raise ValueError("event must start after the pre-sale opens")
+        if not tiers:
+            raise ValueError("at least one tier is required")
+        self.tiers = tiers
+        self.marketing_guests = marketing_guests
+        self.k = k
+        self.ramp = ramp
+        self.prior_guests = prior_guests
+        self._prices, self._limits = tier_arrays(tiers)
+        self._index = {tier['name']: i for i, tier in enumerate(tiers)}
+        self._door = len(tiers) - 1
+        self._presale_capacity = int(self._limits[:-1].sum())
+        self.baseline_guests = int(calculate_tiers_batch(self._prices, self._limits, marketing_guests, k=k)[0])
+        self.reset()
+
+    def reset(self):
+        self.sold = [0] * len(self.tiers)
+        self.revenue = 0.0
+        self.presale_sold = 0
+        self.exposure = 0.0
+        self.records = 0
+        self.skipped = 0
+        self.last_time = None
+
+    def advance(self, now):
+        # Время идёт и без продаж: ожидаемое к now число билетов растёт, пока предпродажа не распродана
+        now = min(max(_timestamp(now), self.sales_start), self.event_start)
+        if self.presale_sold < self._presale_capacity:
+            share = ((now - self.sales_start) / (self.event_start - self.sales_start)) ** self.ramp
+            self.exposure = max(self.exposure, self.baseline_guests * share)
+        self.last_time = now if self.last_time is None else max(self.last_time, now)
+
+    def observe(self, record):
+        # record — {'time', 'tier' (имя или номер), 'quantity' (по умолчанию 1), 'price' (необязательно);
+        # нечитаемые записи пропускаются и считаются в skipped
+        try:
+            tier = record['tier']
+            tier = self._index[tier] if tier in self._index else int(tier)
+            if not 0 <= tier < len(self.tiers):
+                raise ValueError(f"unknown tier {record['tier']!r}")
+            quantity = record.get('quantity')
+            quantity = 1 if quantity in (None, '') else int(quantity)
+            price = record.get('price')
+            price = self.tiers[tier]['price'] if price in (None, '') else float(price)
+            # Возвраты и ошибки кассы (ноль, отрицательное количество или цена) в апостериорное не попадают
+            if quantity <= 0:
+                raise ValueError(f"quantity must be positive, got {quantity}")
+            if not (math.isfinite(price) and price >= 0):
+                raise ValueError(f"price must be a non-negative number, got {price}")
+            time = _timestamp(record['time'])
+        except (KeyError, TypeError, ValueError):
+            self.skipped += 1
+            return
+        self.advance(time)
+        self.sold[tier] += quantity
+        self.revenue += quantity * price
+        if tier != self._door:
+            self.presale_sold += quantity
+        self.records += 1
+
+    def ingest(self, log):
+        # Дочитывает журнал; если его заменили, счётчики сбрасываются и он читается с начала
+        generation = log.generation
+        records = log.read()
+        if log.generation != generation:
+            self.reset()
+        for record in records:
+            self.observe(record)
+        return len(records)
+
+    def posterior(self):
+        alpha, beta = self.prior_guests + self.presale_sold, self.prior_guests + self.exposure
+        return {'mean': alpha / beta, 'p10': _gamma_quantile(alpha, beta, -Z_90), 'p90': _gamma_quantile(alpha, beta, Z_90)}
+
+    def projection(self):
+        # Итог предпродажи и входа при theta = P10, среднее, P90: одно решение равновесия на три сценария.
+        # Проданное остаётся как есть, оставшиеся гости заполняют по порядку свободные места уровней;
+        # выручка — фактическая плюс остаток по ценам уровней.
+        theta = self.posterior()
+        scale = np.array([theta['p10'], theta['mean'], theta['p90']])
+        estimated_guests = calculate_tiers_batch(self._prices, self._limits, self.marketing_guests * scale, k=self.k)[0]
+        sold = np.array(self.sold)
+        extra = allocate_tiers(np.maximum(estimated_guests - sold.sum(), 0), np.maximum(self._limits - sold, 0))
+        final = sold + extra
+        revenue = self.revenue + (extra * self._prices).sum(axis=-1)
+        guests = final.sum(axis=-1)
+        return {
+            'theta': theta,
+            'sold': self.sold,
+            'revenue_so_far': self.revenue,
+            'tier_sales': final[1].tolist(),
+            'estimated_guests': {'p10': int(guests[0]), 'mean': int(guests[1]), 'p90': int(guests[2])},
+            'ticket_revenue': {'p10': float(revenue[0]), 'mean': float(revenue[1]), 'p90': float(revenue[2])},
+            'baseline_guests': self.baseline_guests,
+            'records': self.records,
+            'skipped': self.skipped,
+        }
@@ -0,0 +1,125 @@
+import time
+
+import numpy as np
+
+from forecast import BAR_REVENUE_PER_GUEST, calculate_tiers_batch, fame_factor_for
+
+
+def _same(old, new):
+    if isinstance(old, tuple) and isinstance(new, tuple):
+        return len(old) == len(new) and all(_same(a, b) for a, b in zip(old, new))
+    if isinstance(old, np.ndarray) or isinstance(new, np.ndarray):
+        return isinstance(old, np.ndarray) and isinstance(new, np.ndarray) and np.array_equal(old, new)
+    return type(old) is type(new) and old == new
+
+
+class MetricGraph:
+    # nodes — {имя: (функция, имена зависимостей)}; узел с функцией None — вход. У каждого значения есть
+    # версия, узел пересчитывается, только если сменилась версия хотя бы одной зависимости. Если
+    # пересчитанное значение совпало с прежним, версия не растёт и узлы ниже по графу не трогаются.
+    def __init__(self, nodes):
+        self._nodes = nodes
+        self._values = {}
+        self._versions = dict.fromkeys(nodes, 0)
+        self._keys = {}
+        self._order = []
+        visiting = set()
+
+        def visit(name):
+            if name in self._order:
+                return
+            if name in visiting:
+                raise ValueError(f"dependency cycle through {name!r}")
+            visiting.add(name)
+            function, dependencies = nodes[name]
+            for dependency in dependencies:
+                visit(dependency)
+            self._order.append(name)
+
+        for name in nodes:
+            visit(name)
+        self.timings = {name: {'calls': 0, 'recomputed': False, 'last_ms': 0.0, 'total_ms': 0.0}
+                        for name, (function, _) in nodes.items() if function is not None}
+
+    def _store(self, name, value):
+        if name not in self._values or not _same(self._values[name], value):
+            self._values[name] = value
+            self._versions[name] += 1
+
+    def update(self, **inputs):
+        for name, value in inputs.items():
+            if self._nodes[name][0] is not None:
+                raise ValueError(f"{name!r} is a derived node, not an input")
+            self._store(name, value)
+
+    def evaluate(self, names):
+        needed = set()
+
+        def collect(name):
+            if name not in needed:
+                needed.add(name)
+                for dependency in self._nodes[name][1]:
+                    collect(dependency)
+
+        for name in names:
+            collect(name)
+        for timing in self.timings.values():
+            timing['recomputed'] = False
+        for name in self._order:
+            function, dependencies = self._nodes[name]
+            if function is None or name not in needed:
+                continue
+            key = tuple(self._versions[dependency] for dependency in dependencies)
+            if self._keys.get(name) == key:
+                continue
+            started = time.perf_counter()
+            value = function(*(self._values[dependency] for dependency in dependencies))
+            elapsed = (time.perf_counter() - started) * 1000
+            self._keys[name] = key
+            timing = self.timings[name]
+            timing.update(recomputed=True, last_ms=elapsed, calls=timing['calls'] + 1, total_ms=timing['total_ms'] + elapsed)
+            self._store(name, value)
+        return {name: self._values[name] for name in names}
+
+
+def equilibrium(tier_items, marketing_guests, k):
+    prices = np.array([price for price, _ in tier_items])
+    limits = np.array([limit for _, limit in tier_items], dtype=np.int64)
+    return calculate_tiers_batch(prices, limits, marketing_guests, k=k)
+
+
+FORECAST_INPUTS = ('budget', 'marketing_percent', 'risk_amount', 'free_tickets', 'tier_items', 'fame_override',
+                   'k', 'marketing_effectiveness')
+FORECAST_NODES = {
+    **{name: (None, ()) for name in FORECAST_INPUTS},
+    'marketing_cost': (lambda budget, marketing_percent: budget * marketing_percent, ('budget', 'marketing_percent')),
+    'fame_factor': (
+        lambda marketing_cost, fame_override: fame_factor_for(marketing_cost).item() if fame_override is None else fame_override,
+        ('marketing_cost', 'fame_override')
+    ),
+    'marketing_guests': (
+        lambda marketing_cost, marketing_effectiveness, fame_factor: marketing_cost * marketing_effectiveness * fame_factor,
+        ('marketing_cost', 'marketing_effectiveness', 'fame_factor')
+    ),
+    'equilibrium': (equilibrium, ('tier_items', 'marketing_guests', 'k')),
+    'estimated_guests': (lambda equilibrium: equilibrium[0].item(), ('equilibrium',)),
+    'tier_sales': (lambda equilibrium: equilibrium[1].tolist(), ('equilibrium',)),
+    'avg_ticket_price': (lambda equilibrium: equilibrium[2].item(), ('equilibrium',)),
+    'ticket_revenue': (lambda equilibrium: equilibrium[3].item(), ('equilibrium',)),
+    'solver_iterations': (lambda equilibrium: equilibrium[4].item(), ('equilibrium',)),
+    'total_attendance': (lambda estimated_guests, free_tickets: estimated_guests + free_tickets,
+                         ('estimated_guests', 'free_tickets')),
+    'remaining_budget': (lambda budget, risk_amount, marketing_cost: budget - risk_amount - marketing_cost,
+                         ('budget', 'risk_amount', 'marketing_cost')),
+    'profit': (lambda remaining_budget, ticket_revenue: remaining_budget + ticket_revenue, ('remaining_budget', 'ticket_revenue')),
+    'net_profit': (lambda profit, risk_amount: profit - risk_amount, ('profit', 'risk_amount')),
+    'bar_revenue': (lambda total_attendance: total_attendance * BAR_REVENUE_PER_GUEST, ('total_attendance',)),
+}
+FORECAST_METRICS = ('marketing_cost', 'fame_factor', 'marketing_guests', 'estimated_guests', 'tier_sales',
+                    'avg_ticket_price', 'ticket_revenue', 'total_attendance', 'profit', 'bar_revenue',
+                    'remaining_budget', 'net_profit', 'solver_iterations')
+
+
+def forecast_graph(solve=equilibrium):
+    # solve — замена узла равновесия с той же сигнатурой, например кэширующая обёртка над equilibrium
+    return MetricGraph(dict(FORECAST_NODES, equilibrium=(solve, FORECAST_NODES['equilibrium'][1])))
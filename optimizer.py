@@ -0,0 +1,108 @@
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, forecast_batch
+
+OBJECTIVES = ('ticket_revenue', 'net_profit')
+# При большем числе уровней полная сетка grid_size^N не помещается в память, и цены ищутся покоординатно
+MAX_GRID_TIERS = 4
+
+
+def _evaluate(prices, budget, marketing_percent, risk_amount, free_tickets, limits, fame_factor, objective, monotonic,
+              k, marketing_effectiveness):
+    # prices — массив (..., N) комбинаций цен уровней
+    values = forecast_batch(budget, marketing_percent, risk_amount, free_tickets, prices, limits, fame_factor,
+                            k, marketing_effectiveness)[objective]
+    values = np.asarray(values, dtype=float)
+    if monotonic:
+        ordered = np.all(np.diff(prices, axis=-1) >= 0, axis=-1)
+        values = np.where(ordered, values, -np.inf)
+    return values
+
+
+def _grid(axes):
+    return np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+
+
+def _coordinate_search(best, best_value, candidates, args):
+    # Для каждого уровня по очереди перебираются все кандидаты его цены при остальных фиксированных,
+    # проходы повторяются, пока цена хотя бы одного уровня меняется.
+    evaluations = 0
+    improved = True
+    while improved:
+        improved = False
+        for i in range(best.size):
+            axis = candidates(best[i])
+            trial = np.repeat(best[None, :], axis.size, axis=0)
+            trial[:, i] = axis
+            values = _evaluate(trial, *args)
+            evaluations += values.size
+            j = np.argmax(values)
+            if values[j] > best_value:
+                best_value = values[j]
+                best = trial[j]
+                improved = True
+    return best, best_value, evaluations
+
+
+def optimize_prices(budget, marketing_percent, limits, free_tickets=0, risk_amount=0, fame_factor=None,
+                    objective='ticket_revenue', price_range=(100, 5000), price_step=10, grid_size=12,
+                    refine_size=7, monotonic=False, k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS):
+    # limits — лимиты уровней по порядку. Поиск от грубой сетки к мелкой: сначала grid_size^N комбинаций
+    # цен на всём диапазоне, затем сетки refine_size^N вокруг лучшей точки с шагом, уменьшающимся вдвое
+    # до price_step. Больше MAX_GRID_TIERS уровней — те же шаги, но покоординатно от лучшей единой цены.
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}, got {objective!r}")
+    limits = np.asarray(limits, dtype=np.int64)
+    n_tiers = limits.size
+    if n_tiers == 0:
+        raise ValueError("at least one ticket tier is required")
+    low, high = price_range
+    args = (budget, marketing_percent, risk_amount, free_tickets, limits, fame_factor, objective, monotonic,
+            k, marketing_effectiveness)
+
+    axis = np.unique(np.round(np.linspace(low, high, grid_size) / price_step) * price_step)
+    surface = None
+    if n_tiers <= MAX_GRID_TIERS:
+        values = _evaluate(_grid([axis] * n_tiers), *args)
+        best_index = np.unravel_index(np.argmax(values), values.shape)
+        best = np.array([axis[i] for i in best_index])
+        best_value = values[best_index]
+        evaluations = values.size
+        if n_tiers >= 2:
+            surface = {'axis': axis, 'values': values}
+    else:
+        uniform = _evaluate(np.repeat(axis[:, None], n_tiers, axis=1), *args)
+        best, best_value = np.full(n_tiers, axis[np.argmax(uniform)]), uniform.max()
+        best, best_value, evaluations = _coordinate_search(best, best_value, lambda price: axis, args)
+        evaluations += uniform.size
+
+    step = (axis[1] - axis[0]) / 2 if axis.size > 1 else price_step
+    offsets = np.arange(refine_size) - refine_size // 2
+    while True:
+        step = max(price_step, np.round(step / price_step) * price_step)
+
+        def candidates(center):
+            return np.unique(np.clip(center + offsets * step, low, high))
+
+        if n_tiers <= MAX_GRID_TIERS:
+            axes = [candidates(center) for center in best]
+            values = _evaluate(_grid(axes), *args)
+            evaluations += values.size
+            index = np.unravel_index(np.argmax(values), values.shape)
+            if values[index] > best_value:
+                best_value = values[index]
+                best = np.array([axes[i][j] for i, j in enumerate(index)])
+        else:
+            best, best_value, count = _coordinate_search(best, best_value, candidates, args)
+            evaluations += count
+        if step == price_step:
+            break
+        step /= 2
+
+    return {
+        'prices': [int(price) for price in best],
+        'objective': objective,
+        'value': float(best_value),
+        'evaluations': int(evaluations),
+        'surface': surface,
+    }
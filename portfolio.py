@@ -0,0 +1,90 @@
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, fame_factor_for, forecast_batch
+
+
+def response_curves(events, levels, k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS, metric='net_profit'):
+    # Значение metric каждого мероприятия при маркетинге levels (₽) — один вызов forecast_batch на
+    # сетке (мероприятие, уровень). Уровни дороже бюджета мероприятия недопустимы и равны -inf.
+    n_tiers = max(len(event['tiers']) for event in events)
+    prices = np.zeros((len(events), 1, n_tiers))
+    limits = np.zeros((len(events), 1, n_tiers), dtype=np.int64)
+    for i, event in enumerate(events):
+        prices[i, 0, :len(event['tiers'])] = [tier['price'] for tier in event['tiers']]
+        limits[i, 0, :len(event['tiers'])] = [tier['limit'] for tier in event['tiers']]
+    budget = np.array([event['budget'] for event in events], dtype=float)[:, None]
+    risk_amount = np.array([event.get('risk_amount', 0) for event in events], dtype=float)[:, None]
+    free_tickets = np.array([event.get('free_tickets', 0) for event in events], dtype=np.int64)[:, None]
+
+    marketing_percent = np.divide(levels, budget, out=np.zeros((len(events), levels.size)), where=budget > 0)
+    fame_factor = None
+    if any(event.get('fame_factor') is not None for event in events):
+        # Заданная известность мероприятия фиксирована, остальные интерполируются от затрат
+        fixed = np.array([np.nan if event.get('fame_factor') is None else event['fame_factor'] for event in events])[:, None]
+        fame_factor = np.where(np.isnan(fixed), fame_factor_for(budget * marketing_percent), fixed)
+
+    values = forecast_batch(budget, marketing_percent, risk_amount, free_tickets, prices, limits, fame_factor,
+                            k, marketing_effectiveness)[metric]
+    return np.where(levels <= budget, np.asarray(values, dtype=float), -np.inf)
+
+
+def _best_move(curve, level, max_units):
+    # Лучший прирост на рубль при переходе с уровня level на любой более высокий в пределах max_units:
+    # просмотр вперёд, а не на один шаг, нужен из-за выпуклого участка кривой, где известность
+    # растёт вместе с затратами и первые шаги окупаются хуже следующих.
+    candidates = curve[level + 1:level + 1 + max_units]
+    if candidates.size == 0:
+        return -np.inf, 0
+    gains = (candidates - curve[level]) / np.arange(1, candidates.size + 1)
+    best = int(np.argmax(gains))
+    return gains[best], best + 1
+
+
+def allocate_marketing(events, total_marketing, step=1000, k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS,
+                       metric='net_profit'):
+    # events — [{'name', 'budget', 'risk_amount', 'free_tickets', 'tiers', 'fame_factor' (необязательно)}, ...].
+    # Общий маркетинговый бюджет делится шагами step жадно: каждый раз деньги получает мероприятие с
+    # наибольшим приростом metric на рубль; остаток не тратится, если прирост больше не положителен.
+    if not events:
+        raise ValueError("at least one event is required")
+    units = int(total_marketing // step)
+    max_budget = max(event['budget'] for event in events)
+    levels = np.arange(min(units, int(max_budget // step)) + 1) * step
+    curves = response_curves(events, levels, k, marketing_effectiveness, metric)
+
+    allocation = np.zeros(len(events), dtype=np.int64)
+    best_gain = np.empty(len(events))
+    best_units = np.zeros(len(events), dtype=np.int64)
+    for i in range(len(events)):
+        best_gain[i], best_units[i] = _best_move(curves[i], 0, units)
+
+    remaining = units
+    moves = 0
+    while remaining > 0:
+        i = int(np.argmax(best_gain))
+        if best_gain[i] <= 0:
+            break
+        if best_units[i] > remaining:
+            # Лучший переход больше не помещается в остаток бюджета — ищем его заново
+            best_gain[i], best_units[i] = _best_move(curves[i], allocation[i], remaining)
+            continue
+        allocation[i] += best_units[i]
+        remaining -= best_units[i]
+        moves += 1
+        best_gain[i], best_units[i] = _best_move(curves[i], allocation[i], remaining)
+
+    values = curves[np.arange(len(events)), allocation]
+    baseline = curves[:, 0]
+    return {
+        'allocation': {event['name']: int(units_spent * step) for event, units_spent in zip(events, allocation)},
+        'marketing_percent': {
+            event['name']: units_spent * step / event['budget'] if event['budget'] else 0.0
+            for event, units_spent in zip(events, allocation)
+        },
+        metric: {event['name']: float(value) for event, value in zip(events, values)},
+        'total': float(values.sum()),
+        'total_without_marketing': float(baseline.sum()),
+        'spent': int((units - remaining) * step),
+        'evaluations': int(curves.size),
+        'moves': moves,
+    }
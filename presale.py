@@ -0,0 +1,75 @@
+import numpy as np
+
+def demand_curve(total_demand, days, ramp=2.0):
+    # Накопленный спрос к концу каждого дня предпродажи: доля (t / days) ** ramp, к дню перед
+    # мероприятием весь спрос прогноза уже проявился.
+    share = (np.arange(1, days + 1) / days) ** ramp
+    return np.floor(total_demand * share).astype(np.int64)
+
+
+class PresaleTimeline:
+    # Результаты уровней кэшируются: уровень i зависит только от кривой спроса, суммы лимитов
+    # предыдущих уровней, своего лимита и цены. При изменении одного уровня пересчитывается он
+    # и уровни после него, если сдвинулась их нижняя граница; суммы выручки берутся из префикса.
+    def __init__(self, days=60, ramp=2.0):
+        self.days = days
+        self.ramp = ramp
+        self._demand_key = None
+        self._demand = None
+        self._stages = []
+        self._cash_prefix = []
+
+    def run(self, estimated_guests, tiers, door_sales):
+        # tiers — уровни по порядку; все, кроме последнего, продаются заранее, последний — на входе
+        demand_key = (int(estimated_guests), self.days, self.ramp)
+        if demand_key != self._demand_key:
+            self._demand_key = demand_key
+            self._demand = demand_curve(estimated_guests, self.days, self.ramp)
+            self._stages, self._cash_prefix = [], []
+
+        presale_tiers, door = tiers[:-1], tiers[-1]
+        del self._stages[len(presale_tiers):]
+        del self._cash_prefix[len(presale_tiers):]
+        recomputed = []
+        offset = 0
+        for i, tier in enumerate(presale_tiers):
+            price, limit = tier['price'], tier['limit']
+            key = (offset, limit, price)
+            if i < len(self._stages) and self._stages[i]['key'] == key:
+                offset += limit
+                continue
+            sales = np.clip(self._demand - offset, 0, limit)
+            sellout = int(np.searchsorted(self._demand, offset + limit)) if limit > 0 else 0
+            entry = {
+                'key': key,
+                'sales': sales,
+                'revenue': sales * price,
+                'sellout_day': sellout if sellout < self.days else None,
+            }
+            if i < len(self._stages):
+                self._stages[i] = entry
+            else:
+                self._stages.append(entry)
+            del self._cash_prefix[i:]
+            recomputed.append(i)
+            offset += limit
+
+        for i in range(len(self._cash_prefix), len(presale_tiers)):
+            previous = self._cash_prefix[i - 1] if i else 0
+            self._cash_prefix.append(previous + self._stages[i]['revenue'])
+
+        presale_cash = self._cash_prefix[-1] if self._cash_prefix else np.zeros(self.days)
+        door_revenue = door_sales * door['price']
+        return {
+            'day': np.arange(-self.days, 1),
+            'demand': np.append(self._demand, self._demand[-1]),
+            'tiers': [tier['name'] for tier in tiers],
+            'stage_sales': [np.append(entry['sales'], entry['sales'][-1]) for entry in self._stages] + [
+                np.append(np.zeros(self.days, dtype=np.int64), door_sales)
+            ],
+            'sellout_day': [
+                None if entry['sellout_day'] is None else entry['sellout_day'] - self.days for entry in self._stages
+            ],
+            'cash': np.append(presale_cash, presale_cash[-1] + door_revenue),
+            'recomputed': recomputed,
+        }
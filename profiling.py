@@ -0,0 +1,119 @@
+import cProfile
+import json
+import os
+import platform
+import pstats
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_MODES = ('spans', 'cprofile')
+PROFILE_HISTORY = 50
+PROFILE_TOP_FUNCTIONS = 30
+
+
+def profile_mode(value):
+    # '1', 'spans' — только этапы; 'cprofile' — этапы и cProfile; пусто, '0' — выключено
+    value = (value or '').strip().lower()
+    if value in ('', '0', 'off', 'false'):
+        return None
+    if value in ('1', 'on', 'true'):
+        return 'spans'
+    if value not in PROFILE_MODES:
+        raise ValueError(f"profile mode must be one of {PROFILE_MODES}, got {value!r}")
+    return value
+
+
+def _top_functions(profile, limit):
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        'function': f"{os.path.basename(filename)}:{line}({name})" if line else name,
+        'calls': calls, 'tottime_ms': tottime * 1000, 'cumtime_ms': cumtime * 1000,
+    } for (filename, line, name), (_, calls, tottime, cumtime, _) in rows]
+
+
+class Profiler:
+    # Этапы одного перезапуска: span() замеряет вложенные участки, run = {'label', 'started', 'total_ms',
+    # 'spans': [{'name', 'depth', 'start_ms', 'ms'}], 'functions'}. Выключенный профайлер стоит одну
+    # проверку флага на span. Если span открыт вне begin()/end() — фрагмент перезапущен без страницы, —
+    # он сам становится отдельным перезапуском. Последние history перезапусков хранятся в памяти,
+    # при заданном log_path каждый дописывается туда строкой JSONL.
+    def __init__(self, history=PROFILE_HISTORY, log_path=None):
+        self.mode = None
+        self.log_path = log_path
+        self.runs = deque(maxlen=history)
+        self._run = None
+        self._depth = 0
+        self._started = 0.0
+        self._profile = None
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def begin(self, label, mode=None):
+        # Незаконченный перезапуск (st.stop(), исключение) закрывается как есть
+        if self._run is not None:
+            self.end()
+        self.mode = mode
+        if not self.enabled:
+            return
+        self._run = {'label': label, 'started': datetime.now().isoformat(timespec='seconds'), 'spans': [], 'functions': None}
+        self._depth = 0
+        if mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # В потоке уже работает другой профайлер (отладчик, вложенный запуск)
+                self._profile = None
+        self._started = time.perf_counter()
+
+    def end(self):
+        run, self._run = self._run, None
+        if run is None:
+            return None
+        run['total_ms'] = (time.perf_counter() - self._started) * 1000
+        if self._profile is not None:
+            self._profile.disable()
+            run['functions'] = _top_functions(self._profile, PROFILE_TOP_FUNCTIONS)
+            self._profile = None
+        self.runs.append(run)
+        if self.log_path:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(dict(run, meta=self.meta()), ensure_ascii=False) + '\n')
+        return run
+
+    @contextmanager
+    def span(self, name):
+        if not self.enabled:
+            yield
+            return
+        implicit = self._run is None
+        if implicit:
+            self.begin(name, self.mode)
+        span = {'name': name, 'depth': self._depth, 'start_ms': (time.perf_counter() - self._started) * 1000}
+        self._run['spans'].append(span)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            span['ms'] = (time.perf_counter() - self._started) * 1000 - span['start_ms']
+            if implicit:
+                self.end()
+
+    def meta(self):
+        # Версии окружения рядом с замерами: по ним сравниваются выкладки
+        versions = {'python': platform.python_version()}
+        for package in ('numpy', 'streamlit', 'plotly'):
+            try:
+                versions[package] = __import__(package).__version__
+            except ImportError:
+                pass
+        return {'release': os.environ.get('FFP_RELEASE'), 'host': platform.node(), 'pid': os.getpid(), 'versions': versions}
+
+    def to_json(self):
+        return json.dumps({'meta': self.meta(), 'runs': list(self.runs)}, ensure_ascii=False, indent=1)
@@ -0,0 +1,259 @@
+"""Столбцовые файлы результатов прогонов: Arrow IPC (.arrow, .feather) или Parquet (.parquet).
+
+    python result_store.py info results.arrow
+    python result_store.py head results.arrow --columns budget net_profit --filter "net_profit<0" -n 20
+    python result_store.py summary results.arrow net_profit ticket_revenue --filter "marketing_percent>=0.2"
+
+Запись идёт чанками, чтение — потоком record batch'ей с выбором столбцов и фильтром по строкам,
+поэтому файл может быть больше оперативной памяти. Нужен pyarrow (pip install pyarrow).
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+
+import numpy as np
+
+ARROW_SUFFIXES = ('.arrow', '.feather', '.ipc')
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+SCAN_BATCH_ROWS = 1 << 17
+SUMMARY_BINS = 4096
+PERCENTILES = (10, 50, 90)
+FILTER_PATTERN = re.compile(r'^\s*(\w+)\s*(==|!=|<=|>=|<|>)\s*(.+?)\s*$')
+
+
+def _pyarrow():
+    # pyarrow необязателен: без него работают приложение и CLI с CSV/JSONL, нужен он только здесь
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("columnar result files need pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def is_columnar(path):
+    return path.lower().endswith(ARROW_SUFFIXES + PARQUET_SUFFIXES)
+
+
+def _format(path):
+    if path.lower().endswith(ARROW_SUFFIXES):
+        return 'ipc'
+    if path.lower().endswith(PARQUET_SUFFIXES):
+        return 'parquet'
+    raise ValueError(f"unknown result file type {path!r}, expected one of {', '.join(ARROW_SUFFIXES + PARQUET_SUFFIXES)}")
+
+
+class ResultWriter:
+    # Каждый write() — отдельный record batch Arrow IPC или группа строк Parquet, в памяти только текущий
+    # чанк. Схема берётся из первого чанка, следующие приводятся к ней. Файл пишется во временный и
+    # появляется под своим именем только после close(), поэтому читатели не видят недописанный файл.
+    def __init__(self, path, format=None):
+        # format — 'ipc' или 'parquet'; по умолчанию по расширению файла
+        self.path = path
+        self.format = format or _format(path)
+        self.rows = 0
+        self._tmp_path = f'{path}.{os.getpid()}.tmp'
+        self._schema = None
+        self._writer = None
+
+    def write(self, columns):
+        pa = _pyarrow()
+        table = pa.table({name: np.asarray(values) for name, values in columns.items()})
+        if self._writer is None:
+            self._schema = table.schema
+            if self.format == 'ipc':
+                self._writer = pa.ipc.new_file(self._tmp_path, table.schema)
+            else:
+                self._writer = pa.parquet.ParquetWriter(self._tmp_path, table.schema)
+        elif table.schema != self._schema:
+            # Недостающие столбцы заполняются пустыми значениями, лишние — ошибка: схему файла уже не поменять
+            unexpected = [name for name in table.column_names if name not in self._schema.names]
+            if unexpected:
+                raise ValueError(f"columns {unexpected} are not in the schema of {self.path!r}: {self._schema.names}")
+            columns = [
+                table.column(field.name) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+                for field in self._schema
+            ]
+            try:
+                table = pa.table(columns, schema=self._schema)
+            except (TypeError, pa.ArrowInvalid) as e:
+                raise ValueError(f"chunk does not match the schema of {self.path!r}: {e}") from None
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self):
+        if self._writer is None:
+            return
+        self._writer.close()
+        self._writer = None
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def _dataset(path):
+    pa = _pyarrow()
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"no result file {path!r}")
+    # use_mmap: Arrow IPC читается без копирования, страницы файла подгружает ОС по мере обращения
+    filesystem = pa.fs.LocalFileSystem(use_mmap=True)
+    return pa.dataset.dataset(os.path.abspath(path), format=_format(path), filesystem=filesystem)
+
+
+def parse_filter(condition):
+    # 'net_profit<0' -> ('net_profit', '<', 0.0); значение, не похожее на число, остаётся строкой
+    if not isinstance(condition, str):
+        return tuple(condition)
+    match = FILTER_PATTERN.match(condition)
+    if not match:
+        raise ValueError(f"cannot parse filter {condition!r}, expected e.g. 'net_profit<0'")
+    column, op, value = match.groups()
+    try:
+        value = float(value)
+    except ValueError:
+        value = value.strip('\'"')
+    return column, op, value
+
+
+def _expression(filters):
+    # Условия объединяются через И; для Parquet по статистике групп строк пропускаются целые группы
+    if not filters:
+        return None
+    return _pyarrow().parquet.filters_to_expression([parse_filter(condition) for condition in filters])
+
+
+def info(path):
+    dataset = _dataset(path)
+    return {
+        'rows': dataset.count_rows(),
+        'columns': {field.name: str(field.type) for field in dataset.schema},
+        'format': _format(path),
+        'bytes': os.path.getsize(path),
+    }
+
+
+def scan(path, columns=None, filters=None, batch_rows=SCAN_BATCH_ROWS):
+    # Поток словарей {столбец: numpy-массив} по batch_rows строк; читаются только нужные столбцы
+    batches = _dataset(path).to_batches(columns=columns, filter=_expression(filters), batch_size=batch_rows)
+    for batch in batches:
+        if batch.num_rows:
+            yield {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+
+
+def read(path, columns=None, filters=None, limit=None):
+    # Выборка целиком в память: для срезов, которые в неё заведомо помещаются
+    dataset = _dataset(path)
+    expression = _expression(filters)
+    if limit is None:
+        table = dataset.to_table(columns=columns, filter=expression)
+    else:
+        table = dataset.head(limit, columns=columns, filter=expression)
+    return {name: column.to_numpy() for name, column in zip(table.column_names, table.columns)}
+
+
+def _histogram_percentile(edges, counts, q):
+    target = q / 100 * counts.sum()
+    cumulative = np.cumsum(counts)
+    i = min(int(np.searchsorted(cumulative, target)), counts.size - 1)
+    before = cumulative[i] - counts[i]
+    share = (target - before) / counts[i] if counts[i] else 0.0
+    return float(edges[i] + share * (edges[i + 1] - edges[i]))
+
+
+def summarize(path, columns, filters=None, bins=SUMMARY_BINS, percentiles=PERCENTILES):
+    # Два прохода по файлу с постоянной памятью: число, сумма, минимум и максимум, затем гистограмма
+    # на найденном диапазоне. Перцентили — по гистограмме, погрешность не больше ширины корзины.
+    stats = {column: {'count': 0, 'sum': 0.0, 'min': np.inf, 'max': -np.inf} for column in columns}
+    for batch in scan(path, columns, filters):
+        for column, values in batch.items():
+            if values.dtype.kind not in 'biuf':
+                raise ValueError(f"column {column!r} is not numeric")
+            values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+            if values.size:
+                entry = stats[column]
+                entry['count'] += values.size
+                entry['sum'] += float(values.sum())
+                entry['min'] = min(entry['min'], float(values.min()))
+                entry['max'] = max(entry['max'], float(values.max()))
+
+    histograms = {}
+    for column, entry in stats.items():
+        if entry['count']:
+            high = entry['max'] if entry['max'] > entry['min'] else entry['min'] + 1
+            histograms[column] = (np.linspace(entry['min'], high, bins + 1), np.zeros(bins, dtype=np.int64))
+    if histograms:
+        for batch in scan(path, list(histograms), filters):
+            for column, values in batch.items():
+                edges, counts = histograms[column]
+                counts += np.histogram(values[~np.isnan(values)] if values.dtype.kind == 'f' else values, edges)[0]
+
+    summary = {}
+    for column, entry in stats.items():
+        result = {'count': entry['count']}
+        if entry['count']:
+            edges, counts = histograms[column]
+            result.update(mean=entry['sum'] / entry['count'], min=entry['min'], max=entry['max'])
+            result.update((f'p{q}', _histogram_percentile(edges, counts, q)) for q in percentiles)
+            result['histogram'] = {'edges': edges, 'counts': counts}
+        summary[column] = result
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Файлы результатов прогонов в формате Arrow IPC / Parquet")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info_parser = subparsers.add_parser('info', help="число строк и столбцы")
+    info_parser.add_argument('path')
+    head_parser = subparsers.add_parser('head', help="первые строки в CSV")
+    head_parser.add_argument('path')
+    head_parser.add_argument('--columns', nargs='+')
+    head_parser.add_argument('--filter', action='append', dest='filters')
+    head_parser.add_argument('-n', type=int, default=10)
+    summary_parser = subparsers.add_parser('summary', help="сводка по числовым столбцам")
+    summary_parser.add_argument('path')
+    summary_parser.add_argument('columns', nargs='+')
+    summary_parser.add_argument('--filter', action='append', dest='filters')
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == 'info':
+            result = info(args.path)
+            print(f"{result['format']}, строк: {result['rows']:,d}, {result['bytes'] / 2 ** 20:,.1f} МБ")
+            for name, dtype in result['columns'].items():
+                print(f"  {name}: {dtype}")
+        elif args.command == 'head':
+            rows = read(args.path, args.columns, args.filters, limit=args.n)
+            writer = csv.writer(sys.stdout)
+            writer.writerow(rows)
+            writer.writerows(zip(*(values.tolist() for values in rows.values())))
+        else:
+            summary = summarize(args.path, args.columns, args.filters)
+            writer = csv.writer(sys.stdout)
+            fields = ('count', 'mean', 'min') + tuple(f'p{q}' for q in PERCENTILES) + ('max',)
+            writer.writerow(('column',) + fields)
+            for column, stats in summary.items():
+                writer.writerow((column,) + tuple(stats.get(field, '') for field in fields))
+    except (ValueError, ImportError, OSError) as e:
+        parser.exit(2, f"error: {e}\n")
+
+
+if __name__ == "__main__":
+    main()
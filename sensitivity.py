@@ -0,0 +1,62 @@
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, forecast_batch, tier_arrays
+
+GLOBAL_INPUTS = ('marketing_percent', 'free_tickets', 'risk_amount')
+TIER_INPUTS = ('tier_price', 'tier_limit')
+INTEGER_INPUTS = ('free_tickets', 'tier_limit')
+# Шаг для входов с нулевым базовым значением, где относительное отклонение ничего не меняет
+ABSOLUTE_STEPS = {'marketing_percent': 0.01, 'free_tickets': 1, 'risk_amount': 1000}
+
+
+def sensitivity_analysis(budget, marketing_percent, risk_amount, free_tickets, tiers, fame_factor=None,
+                         k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS, relative_step=0.1, metric='net_profit'):
+    # Все отклонения считаются одним вызовом forecast_batch: строка 0 — базовый сценарий,
+    # строки 2i+1 и 2i+2 — вход i, уменьшенный и увеличенный на relative_step.
+    # Входы — общие параметры и цена и количество каждого уровня (tier — номер уровня).
+    base_inputs = {'marketing_percent': marketing_percent, 'free_tickets': free_tickets, 'risk_amount': risk_amount}
+    prices, limits = tier_arrays(tiers)
+    inputs = [(name, None) for name in GLOBAL_INPUTS] + [(name, i) for i in range(len(tiers)) for name in TIER_INPUTS]
+
+    n_rows = 1 + 2 * len(inputs)
+    columns = {name: np.full(n_rows, value, dtype=float) for name, value in base_inputs.items()}
+    columns['tier_price'] = np.tile(prices.astype(float), (n_rows, 1))
+    columns['tier_limit'] = np.tile(limits.astype(float), (n_rows, 1))
+    for i, (name, tier) in enumerate(inputs):
+        column = columns[name] if tier is None else columns[name][:, tier]
+        value = column[0]
+        delta = abs(value) * relative_step or ABSOLUTE_STEPS.get(name, 1)
+        if name in INTEGER_INPUTS:
+            delta = max(1, round(delta))
+        low = max(0, value - delta)
+        if name == 'tier_price':
+            low = max(1, low)
+        column[2 * i + 1] = low
+        column[2 * i + 2] = value + delta
+    for name in INTEGER_INPUTS:
+        columns[name] = columns[name].astype(np.int64)
+
+    result = forecast_batch(
+        budget, columns['marketing_percent'], columns['risk_amount'], columns['free_tickets'],
+        columns['tier_price'], columns['tier_limit'], fame_factor, k, marketing_effectiveness
+    )
+    values = np.asarray(result[metric], dtype=float)
+    base = values[0]
+
+    rows = []
+    for i, (name, tier) in enumerate(inputs):
+        column = columns[name] if tier is None else columns[name][:, tier]
+        value, low_input, high_input = column[0].item(), column[2 * i + 1], column[2 * i + 2]
+        low, high = values[2 * i + 1], values[2 * i + 2]
+        # Эластичность по центральной разности: d ln(metric) / d ln(input)
+        if base != 0 and value != 0 and high_input != low_input:
+            elasticity = float((high - low) / base / ((high_input - low_input) / value))
+        else:
+            elasticity = float('nan')
+        rows.append({
+            'input': name, 'tier': tier, 'tier_name': None if tier is None else tiers[tier]['name'],
+            'value': value, 'low_input': low_input.item(), 'high_input': high_input.item(),
+            'low': float(low - base), 'high': float(high - base), 'elasticity': elasticity,
+        })
+    rows.sort(key=lambda row: abs(row['high'] - row['low']), reverse=True)
+    return {'metric': metric, 'base': float(base), 'inputs': rows}
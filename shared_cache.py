@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from calibration import DEFAULT_CACHE_DIR
+
+# Меняется, когда меняется смысл результатов (модель, поля): старые записи просто перестают находиться
+CACHE_VERSION = 1
+DEFAULT_PATH = os.environ.get('FFP_SHARED_CACHE_PATH', os.path.join(DEFAULT_CACHE_DIR, 'results.sqlite'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('FFP_SHARED_CACHE_MB', 256)) * 2 ** 20)
+BUSY_TIMEOUT_MS = 5000
+# Время последнего обращения обновляется не чаще раза в TOUCH_INTERVAL секунд: чтение почти никогда не пишет
+TOUCH_INTERVAL = 60.0
+EVICT_EVERY = 64
+SQL_BATCH = 500
+
+
+def _canonical(value):
+    # Равные числа дают один ключ: np.int64(1), 1 и 1.0 записываются как 1, кортежи и массивы — как списки
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def cache_key(kind, inputs):
+    # Канонический JSON: порядок ключей и пробелы не влияют на хэш
+    payload = json.dumps({'kind': kind, 'version': CACHE_VERSION, 'inputs': _canonical(inputs)},
+                         sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SharedCache:
+    # Кэш результатов в SQLite, общий для всех процессов (воркеров gunicorn, сессий Streamlit) и
+    # переживающий перезапуск. WAL позволяет читать параллельно с записью, busy_timeout — ждать
+    # чужую запись вместо ошибки; у каждого потока и процесса своё соединение. Объём ограничен
+    # max_bytes: при превышении удаляются давно не использованные записи (LRU). Значения хранятся
+    # через pickle — файл пишет и читает только само приложение. max_bytes=0 отключает кэш. Ошибки
+    # SQLite и файловой системы (диск полон, база занята дольше таймаута, каталог недоступен) не роняют
+    # расчёт: кэш ведёт себя как пустой.
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+        # После fork соединение родителя использовать нельзя — открываем своё
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE сразу берёт блокировку записи: параллельные писатели ждут busy_timeout, а не падают посреди транзакции
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get_many(self, keys):
+        # {ключ: значение} для найденных ключей
+        if not self.max_bytes or not keys:
+            return {}
+        found, stale = {}, []
+        now = time.time()
+        keys = list(dict.fromkeys(keys))
+        try:
+            connection = self._connection()
+            for start in range(0, len(keys), SQL_BATCH):
+                batch = keys[start:start + SQL_BATCH]
+                rows = connection.execute(
+                    f"SELECT key, value, last_used FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                )
+                for key, value, last_used in rows:
+                    found[key] = pickle.loads(value)
+                    if now - last_used > TOUCH_INTERVAL:
+                        stale.append((now, key))
+            if stale:
+                connection.executemany("UPDATE entries SET last_used = ? WHERE key = ?", stale)
+        except (sqlite3.Error, OSError):
+            pass
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, kind, items):
+        # items — {ключ: значение}; одна транзакция на весь набор
+        if not self.max_bytes or not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            rows.append((key, kind, blob, len(blob), now))
+        with self._lock:
+            self._writes += len(rows)
+            evict = self._writes >= EVICT_EVERY
+            if evict:
+                self._writes = 0
+        try:
+            with self._transaction() as connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO entries (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)", rows
+                )
+            if evict:
+                self.evict()
+        except (sqlite3.Error, OSError):
+            pass
+
+    def get(self, kind, inputs, default=None):
+        key = cache_key(kind, inputs)
+        return self.get_many([key]).get(key, default)
+
+    def get_or_compute(self, kind, inputs, compute):
+        # Два процесса с одинаковым промахом посчитают результат оба; запись последнего просто заменит первую
+        key = cache_key(kind, inputs)
+        found = self.get_many([key])
+        if key in found:
+            return found[key]
+        value = compute()
+        self.put_many(kind, {key: value})
+        return value
+
+    def evict(self):
+        # Суммарный размер считается запросом к таблице, поэтому учитываются записи всех процессов
+        with self._transaction() as connection:
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            # Удаляем самые старые записи, пока не останется 90% лимита — чтобы не вытеснять на каждой записи
+            excess = total - int(0.9 * self.max_bytes)
+            victims = []
+            for key, size in connection.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            connection.executemany("DELETE FROM entries WHERE key = ?", victims)
+            return len(victims)
+
+    def stats(self):
+        # Выключенный или недоступный кэш показывается пустым
+        entries = size = 0
+        if self.max_bytes:
+            try:
+                entries, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            except (sqlite3.Error, OSError):
+                pass
+        return {'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        if not self.max_bytes:
+            return
+        try:
+            self._connection().execute("DELETE FROM entries")
+        except (sqlite3.Error, OSError):
+            pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def shared_cache(path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+    # Один объект на путь в процессе: счётчики попаданий общие для всех вызывающих
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = SharedCache(path, max_bytes)
+        return cache
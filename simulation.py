@@ -0,0 +1,88 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, fame_factor_for, forecast_batch, tier_arrays
+from result_store import ResultWriter
+
+PERCENTILES = (10, 50, 90)
+METRICS = ('total_attendance', 'ticket_revenue', 'net_profit')
+
+
+def default_distributions(fame_factor):
+    # Каждое распределение — кортеж (имя метода numpy.random.Generator, *параметры).
+    if fame_factor <= 0:
+        fame_spec = ('fixed', fame_factor)
+    else:
+        fame_spec = ('triangular', 0.8 * fame_factor, fame_factor, 1.2 * fame_factor)
+    return {
+        'k': ('normal', K, 0.1 * K),
+        'marketing_effectiveness': ('normal', MARKETING_EFFECTIVENESS, 0.15 * MARKETING_EFFECTIVENESS),
+        'fame_factor': fame_spec,
+    }
+
+
+def _sample(rng, spec, size):
+    method, *params = spec
+    if method == 'fixed':
+        return np.full(size, params[0], dtype=float)
+    return np.maximum(0.0, getattr(rng, method)(*params, size=size))
+
+
+def _simulate_chunk(task):
+    scenario, distributions, seed, size, keep_samples = task
+    rng = np.random.default_rng(seed)
+    # Порядок выборки фиксирован, чтобы результат зависел только от seed чанка
+    samples = {name: _sample(rng, distributions[name], size) for name in ('k', 'marketing_effectiveness', 'fame_factor')}
+    result = forecast_batch(
+        scenario['budget'], scenario['marketing_percent'], scenario['risk_amount'], scenario['free_tickets'],
+        scenario['prices'], scenario['limits'], samples['fame_factor'], samples['k'], samples['marketing_effectiveness']
+    )
+    metrics = {metric: result[metric] for metric in METRICS}
+    return {**samples, **metrics} if keep_samples else metrics
+
+
+def run_monte_carlo(budget, marketing_percent, risk_amount, free_tickets, tiers, fame_factor=None,
+                    distributions=None, n_draws=100_000, seed=0, chunk_size=25_000, workers=None, output=None):
+    # Выборка делится на чанки фиксированного размера со своими SeedSequence, поэтому
+    # результат при одном seed не зависит от числа процессов. output — путь .arrow/.parquet:
+    # входы и метрики каждого прогона дописываются туда по чанку, по мере готовности.
+    if fame_factor is None:
+        fame_factor = fame_factor_for(budget * marketing_percent).item()
+    specs = default_distributions(fame_factor)
+    specs.update(distributions or {})
+
+    prices, limits = tier_arrays(tiers)
+    scenario = {
+        'budget': budget, 'marketing_percent': marketing_percent, 'risk_amount': risk_amount,
+        'free_tickets': free_tickets, 'prices': prices, 'limits': limits
+    }
+    sizes = [chunk_size] * (n_draws // chunk_size) + ([n_draws % chunk_size] if n_draws % chunk_size else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(scenario, specs, chunk_seed, size, output is not None) for chunk_seed, size in zip(seeds, sizes)]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    with ExitStack() as stack:
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            results = executor.map(_simulate_chunk, tasks)
+        else:
+            results = map(_simulate_chunk, tasks)
+        writer = stack.enter_context(ResultWriter(output)) if output is not None else None
+        chunks = []
+        for chunk in results:
+            if writer is not None:
+                writer.write(chunk)
+            chunks.append({metric: chunk[metric] for metric in METRICS})
+
+    results = {metric: np.concatenate([chunk[metric] for chunk in chunks]) for metric in METRICS}
+    summary = {
+        metric: dict(zip((f'p{p}' for p in PERCENTILES), np.percentile(values, PERCENTILES).tolist()))
+        for metric, values in results.items()
+    }
+    summary['loss_probability'] = float(np.mean(results['net_profit'] < 0))
+    summary['draws'] = n_draws
+    summary['workers'] = workers
+    return summary
@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import closing
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_store
+from event_store import SEED_EVENTS, connect, new_catalog, refresh_catalog, upsert_events
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'events.db')
+
+
+def fetch(path, name):
+    with closing(connect(path)) as conn:
+        return dict(conn.execute("SELECT * FROM events WHERE name = ?", (name,)).fetchone())
+
+
+def test_upsert_inserts_with_schema_defaults(db_path):
+    with closing(connect(db_path)) as conn:
+        assert upsert_events(conn, [{'name': 'Drum Night', 'budget': '90000', 'guests': '80', 'ticket_price': '700'}]) == 1
+    event = fetch(db_path, 'Drum Night')
+    assert (event['budget'], event['guests'], event['ticket_price']) == (90000, 80, 700)
+    assert (event['marketing_percent'], event['fame_factor'], event['risk_amount'], event['free_tickets']) == (0.2, 1.0, 0, 0)
+
+
+def test_partial_update_keeps_other_fields(db_path):
+    with closing(connect(db_path)) as conn:
+        upsert_events(conn, [{'name': 'Hardline I', 'budget': 130000, 'guests': '', 'fame_factor': None}])
+    event = fetch(db_path, 'Hardline I')
+    assert event['budget'] == 130000
+    # Пустые поля строки не затирают сохранённые значения
+    assert (event['guests'], event['fame_factor'], event['stage1_limit']) == (140, 1.0, 100)
+
+
+def test_updates_apply_in_input_order(db_path):
+    # Разные наборы полей у одного события в одном пакете: побеждает последняя строка, а не последняя группа
+    with closing(connect(db_path)) as conn:
+        upsert_events(conn, [
+            {'name': 'Hardline I', 'budget': 1},
+            {'name': 'Hardline I', 'budget': 2, 'guests': 7},
+            {'name': 'Hardline I', 'budget': 3},
+            {'name': 'Drum Night', 'budget': 4, 'guests': 5, 'ticket_price': 6},
+            {'name': 'Drum Night', 'guests': 9},
+        ])
+        last_seq = conn.execute("SELECT MAX(updated_seq) FROM events").fetchone()[0]
+    hardline, drum_night = fetch(db_path, 'Hardline I'), fetch(db_path, 'Drum Night')
+    assert (hardline['budget'], hardline['guests']) == (3, 7)
+    assert (drum_night['budget'], drum_night['guests']) == (4, 9)
+    assert drum_night['updated_seq'] == last_seq
+    assert hardline['updated_seq'] == last_seq - 2
+
+
+def test_new_event_without_required_fields_is_rejected(db_path):
+    with closing(connect(db_path)) as conn:
+        with pytest.raises(ValueError, match="'Drum Night'.*ticket_price"):
+            upsert_events(conn, [{'name': 'Hardline I', 'budget': 1}, {'name': 'Drum Night', 'budget': 4, 'guests': 5}])
+    # Пакет откатывается целиком
+    assert fetch(db_path, 'Hardline I')['budget'] == 120000
+
+
+def test_refresh_catalog_loads_only_changes(db_path):
+    catalog = new_catalog(db_path)
+    assert set(refresh_catalog(catalog)) == {event['name'] for event in SEED_EVENTS}
+    seen_seq = catalog['last_seq']
+    with closing(connect(db_path)) as conn:
+        upsert_events(conn, [{'name': 'Neuropunk', 'guests': 600}])
+    # Изменённая запись приходит с новым updated_seq, остальные не перечитываются
+    catalog['events']['Hardline I']['budget'] = 'stale'
+    events = refresh_catalog(catalog)
+    assert events['Neuropunk']['guests'] == 600
+    assert events['Hardline I']['budget'] == 'stale'
+    assert catalog['last_seq'] == seen_seq + 1
+
+
+def test_concurrent_upserts_get_distinct_seqs(db_path):
+    connect(db_path).close()
+    errors = []
+
+    def import_events(offset):
+        try:
+            with closing(connect(db_path)) as conn:
+                for i in range(20):
+                    name = f'Event {offset + i}'
+                    upsert_events(conn, [{'name': name, 'budget': 1, 'guests': 1, 'ticket_price': 1}])
+        except sqlite3.Error as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=import_events, args=(offset,)) for offset in (0, 100, 200, 300)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    with closing(connect(db_path)) as conn:
+        seqs = [seq for (seq,) in conn.execute("SELECT updated_seq FROM events")]
+    assert len(seqs) == len(set(seqs)) == len(SEED_EVENTS) + 80
+
+
+def test_cli_import(db_path, tmp_path, capsys):
+    good = tmp_path / 'good.csv'
+    good.write_text("name,budget,guests,ticket_price\nDrum Night,90000,80,700\nHardline I,130000,,\n", encoding='utf-8')
+    event_store.main(['--db', db_path, 'import', str(good)])
+    assert 'Импортировано: 2' in capsys.readouterr().out
+    assert fetch(db_path, 'Hardline I')['budget'] == 130000
+
+    bad = tmp_path / 'bad.csv'
+    bad.write_text("name,budget\nBass Night,50000\n", encoding='utf-8')
+    with pytest.raises(SystemExit) as exit_info:
+        event_store.main(['--db', db_path, 'import', str(bad)])
+    assert exit_info.value.code == 2
+    assert "'Bass Night' is missing required fields: guests, ticket_price" in capsys.readouterr().err
@@ -0,0 +1,120 @@
+import itertools
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import (K, MARKETING_EFFECTIVENESS, calculate_guests_and_price_batch, forecast_batch, forecast_event,
+                      forecast_records, stage_arrays, stage_tiers)
+
+
+def legacy_calculate_guests_and_price(stage1_price, stage1_limit, stage2_price, stage2_limit, stage3_price, stage3_limit,
+                                      door_price, door_limit, marketing_guests, free_tickets, fame_factor, max_iterations=2):
+    # Исходный цикл из app.py до перехода на NumPy, без изменений
+    total_tickets_available = stage1_limit + stage2_limit + stage3_limit + door_limit
+    if total_tickets_available == 0:
+        return 0, {'stage1': 0, 'stage2': 0, 'stage3': 0, 'door': 0}, 0, 0
+
+    w1 = stage1_limit / total_tickets_available if total_tickets_available > 0 else 0
+    w2 = stage2_limit / total_tickets_available if total_tickets_available > 0 else 0
+    w3 = stage3_limit / total_tickets_available if total_tickets_available > 0 else 0
+    w4 = door_limit / total_tickets_available if total_tickets_available > 0 else 0
+
+    k = 0.0038
+    estimated_guests = 0
+    avg_ticket_price = 0
+    for _ in range(max_iterations):
+        weighted_price = w1 * stage1_price + w2 * stage2_price + w3 * stage3_price + w4 * door_price
+        price_factor = math.exp(-k * weighted_price)
+        estimated_guests = min(total_tickets_available, max(0, round(marketing_guests * price_factor)))
+
+        ticket_sales = {
+            'stage1': min(estimated_guests, stage1_limit) if estimated_guests > 0 else 0,
+            'stage2': min(max(0, estimated_guests - stage1_limit), stage2_limit) if estimated_guests > stage1_limit else 0,
+            'stage3': min(max(0, estimated_guests - stage1_limit - stage2_limit), stage3_limit) if estimated_guests > stage1_limit + stage2_limit else 0,
+            'door': min(max(0, estimated_guests - stage1_limit - stage2_limit - stage3_limit), door_limit) if door_limit > 0 else max(0, estimated_guests - stage1_limit - stage2_limit - stage3_limit)
+        }
+        sold_tickets = sum(ticket_sales.values())
+        ticket_revenue = (ticket_sales['stage1'] * stage1_price +
+                          ticket_sales['stage2'] * stage2_price +
+                          ticket_sales['stage3'] * stage3_price +
+                          ticket_sales['door'] * door_price)
+        avg_ticket_price = ticket_revenue / sold_tickets if sold_tickets > 0 else weighted_price
+
+    return estimated_guests, ticket_sales, avg_ticket_price, ticket_revenue
+
+
+# Фиксированная сетка: цены, лимиты (в том числе нулевые) и спрос от нуля до переполнения всех уровней
+GRID = [
+    {'stage1_price': p1, 'stage1_limit': l1, 'stage2_price': p1 + 100, 'stage2_limit': l2,
+     'stage3_price': p1 + 250, 'stage3_limit': 30, 'door_price': door_price, 'door_limit': door_limit,
+     'marketing_guests': marketing_guests}
+    for p1, l1, l2, door_price, door_limit, marketing_guests in itertools.product(
+        (100, 500, 900), (0, 50), (0, 75), (800, 1500), (0, 200, 999), (0, 37.5, 300, 1234.5, 20000)
+    )
+]
+
+
+def test_fixed_pass_matches_legacy_loop():
+    # С user-014 прогноз ищет равновесие; без итераций решателя остаётся прежняя оценка за один проход,
+    # и векторный расчёт по всей сетке должен совпадать с циклом поштучно
+    columns = {field: np.array([point[field] for point in GRID]) for field in GRID[0]}
+    guests, sales, avg_price, revenue = calculate_guests_and_price_batch(
+        *(columns[field] for field in list(GRID[0])[:8]), columns['marketing_guests'], 0, max_iterations=0
+    )
+    for i, point in enumerate(GRID):
+        expected_guests, expected_sales, expected_avg, expected_revenue = legacy_calculate_guests_and_price(
+            *point.values(), 0, 1.0
+        )
+        assert guests[i] == expected_guests, point
+        assert {stage: values[i] for stage, values in sales.items()} == expected_sales, point
+        assert revenue[i] == expected_revenue, point
+        # Без проданных билетов прежний цикл показывал средневзвешенную цену, теперь — цену первого уровня
+        if expected_guests:
+            assert avg_price[i] == pytest.approx(expected_avg, rel=1e-12), point
+
+
+@pytest.mark.parametrize('fame_factor', [None, 1.0, 10.15])
+def test_forecast_event_matches_batch_rows(fame_factor):
+    # Прогноз одного мероприятия — та же строка, что в пакетном расчёте по всей сетке
+    budgets = np.array([point['marketing_guests'] * 10 for point in GRID])
+    prices, limits = stage_arrays({field: np.array([point[field] for point in GRID]) for field in list(GRID[0])[:8]})
+    batch = forecast_batch(budgets, 0.2, 1000, 20, prices, limits, fame_factor, K, MARKETING_EFFECTIVENESS)
+    for i, point in enumerate(GRID):
+        single = forecast_event(budgets[i], 0.2, 1000, 20, stage_tiers(point), fame_factor)
+        assert single['estimated_guests'] == batch['estimated_guests'][i]
+        assert single['tier_sales'] == batch['tier_sales'][i].tolist()
+        assert single['ticket_revenue'] == batch['ticket_revenue'][i]
+        assert single['net_profit'] == batch['net_profit'][i]
+
+
+SCENARIO = {'budget': 115000, 'marketing_percent': 0.2, 'risk_amount': 0, 'free_tickets': 20,
+            'stage1_price': 500, 'stage1_limit': 50, 'stage2_price': 600, 'stage2_limit': 50,
+            'stage3_price': 700, 'stage3_limit': 50, 'door_price': 1000, 'door_limit': 999}
+
+
+@pytest.mark.parametrize('field, value, message', [
+    ('budget', 'nan', 'must be finite'),
+    ('fame_factor', 'inf', 'must be finite'),
+    ('budget', 'abc', 'must be a number'),
+    ('budget', -1, 'must not be negative'),
+    ('door_price', -1, 'must not be negative'),
+    ('stage1_limit', -50, 'must be a non-negative integer'),
+    ('stage1_limit', 1.5, 'must be a non-negative integer'),
+    ('door_limit', 1e30, 'must be a non-negative integer'),
+    ('marketing_percent', -1, 'must be between 0 and 1'),
+    ('marketing_percent', 1.5, 'must be between 0 and 1'),
+])
+def test_forecast_records_rejects_invalid_fields(field, value, message):
+    with pytest.raises(ValueError, match=f"'{field}' {message}"):
+        forecast_records([SCENARIO, dict(SCENARIO, **{field: value})])
+
+
+def test_forecast_records_accepts_numeric_strings_and_defaults():
+    rows = [dict(SCENARIO, risk_amount='', free_tickets=None, stage1_limit='50', marketing_percent='1')]
+    result = forecast_records(rows)
+    assert all(np.isfinite(values).all() for values in result.values())
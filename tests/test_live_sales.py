@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live_sales import PRIOR_GUESTS, LiveDemand, SalesLog
+
+TIERS = [{'name': 'stage1', 'price': 500, 'limit': 50}, {'name': 'stage2', 'price': 600, 'limit': 50},
+         {'name': 'door', 'price': 1000, 'limit': 999}]
+
+
+def test_gamma_update():
+    demand = LiveDemand(TIERS, 300, 0, 100)
+    demand.observe({'time': 50, 'tier': 'stage1', 'quantity': '10'})
+    demand.observe({'time': 50, 'tier': 1, 'price': '550'})
+    # К середине продаж при ramp=2 ожидается четверть базового спроса
+    exposure = demand.baseline_guests * 0.25
+    theta = demand.posterior()
+    assert demand.exposure == pytest.approx(exposure)
+    assert theta['mean'] == pytest.approx((PRIOR_GUESTS + 11) / (PRIOR_GUESTS + exposure))
+    assert theta['p10'] < theta['mean'] < theta['p90']
+    assert demand.sold == [10, 1, 0] and demand.revenue == 10 * 500 + 550
+
+    projection = demand.projection()
+    assert projection['estimated_guests']['p10'] <= projection['estimated_guests']['mean'] <= projection['estimated_guests']['p90']
+    assert all(final >= sold for final, sold in zip(projection['tier_sales'], demand.sold))
+
+
+def test_door_sales_do_not_update_presale():
+    demand = LiveDemand(TIERS, 300, 0, 100)
+    demand.observe({'time': 100, 'tier': 'door', 'quantity': 5})
+    assert demand.presale_sold == 0 and demand.sold == [0, 0, 5]
+
+
+@pytest.mark.parametrize('record', [
+    {'time': 10, 'tier': 'stage1', 'quantity': 0},
+    {'time': 10, 'tier': 'stage1', 'quantity': -2},
+    {'time': 10, 'tier': 'stage1', 'quantity': '1.5'},
+    {'time': 10, 'tier': 'stage1', 'price': -500},
+    {'time': 10, 'tier': 'stage1', 'price': 'nan'},
+    {'time': 10, 'tier': 'vip'},
+    {'time': 10, 'tier': 3},
+    {'tier': 'stage1'},
+])
+def test_bad_records_are_skipped(record):
+    demand = LiveDemand(TIERS, 300, 0, 100)
+    demand.observe(record)
+    assert (demand.records, demand.skipped, demand.sold, demand.revenue) == (0, 1, [0, 0, 0], 0.0)
+
+
+def test_csv_tail_and_rotation(tmp_path):
+    path = tmp_path / 'sales.csv'
+    path.write_bytes(b'\xef\xbb\xbftime,tier,quantity\n1,stage1,2\n2,stage2,1\n')
+    log = SalesLog(str(path))
+    assert log.read() == [{'time': '1', 'tier': 'stage1', 'quantity': '2'}, {'time': '2', 'tier': 'stage2', 'quantity': '1'}]
+    assert log.read() == []
+    # Неполная строка ждёт перевода строки
+    with open(path, 'a') as f:
+        f.write('3,stage1')
+    assert log.read() == []
+    with open(path, 'a') as f:
+        f.write(',4\n')
+    assert log.read() == [{'time': '3', 'tier': 'stage1', 'quantity': '4'}]
+    assert log.generation == 0
+
+    # Файл заменён новым: заголовок читается заново, растёт generation
+    replacement = tmp_path / 'sales.new'
+    replacement.write_text('tier,time\ndoor,5\n')
+    os.replace(replacement, path)
+    assert log.read() == [{'tier': 'door', 'time': '5'}]
+    assert log.generation == 1
+
+
+def test_jsonl_truncation_resets_demand(tmp_path):
+    path = tmp_path / 'sales.jsonl'
+    records = [{'time': 10, 'tier': 'stage1', 'quantity': 3}, {'time': 20, 'tier': 'stage2'}]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records) + 'not json\n')
+    log = SalesLog(str(path))
+    demand = LiveDemand(TIERS, 300, 0, 100)
+    assert demand.ingest(log) == 2
+    assert demand.sold == [3, 1, 0] and log.skipped == 1
+
+    # Журнал обрезан и начат заново: счётчики сбрасываются, а не складываются со старыми
+    path.write_text(json.dumps({'time': 30, 'tier': 'stage1'}) + '\n')
+    assert demand.ingest(log) == 1
+    assert log.generation == 1
+    assert demand.sold == [1, 0, 0] and demand.records == 1
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_store import ResultWriter, info, read, scan, summarize
+
+
+@pytest.fixture(params=['results.arrow', 'results.parquet'])
+def path(request, tmp_path):
+    return str(tmp_path / request.param)
+
+
+def test_round_trip(path):
+    with ResultWriter(path) as writer:
+        writer.write({'budget': np.arange(3) * 1000, 'net_profit': [-1.5, 0.0, 2.5]})
+        writer.write({'budget': [3000, 4000], 'net_profit': np.array([np.nan, 10.0])})
+        # Пока файл не закрыт, под своим именем его нет
+        assert not os.path.exists(path)
+    assert writer.rows == 5
+    assert info(path)['rows'] == 5
+    result = read(path)
+    assert result['budget'].tolist() == [0, 1000, 2000, 3000, 4000]
+    assert np.array_equal(result['net_profit'], [-1.5, 0.0, 2.5, np.nan, 10.0], equal_nan=True)
+    assert read(path, ['budget'], ['net_profit<0'])['budget'].tolist() == [0]
+    batches = [batch['budget'] for batch in scan(path, ['budget'], batch_rows=2)]
+    assert all(len(batch) <= 2 for batch in batches)
+    assert np.concatenate(batches).tolist() == [0, 1000, 2000, 3000, 4000]
+    summary = summarize(path, ['net_profit'])['net_profit']
+    assert (summary['count'], summary['min'], summary['max']) == (4, -1.5, 10.0)
+
+
+def test_missing_columns_are_filled_with_nulls(path):
+    with ResultWriter(path) as writer:
+        writer.write({'budget': [1000], 'net_profit': [1.0]})
+        writer.write({'budget': [2000]})
+    result = read(path)
+    assert result['budget'].tolist() == [1000, 2000]
+    assert np.isnan(result['net_profit'][1])
+
+
+def test_abort_publishes_nothing(path):
+    with pytest.raises(RuntimeError):
+        with ResultWriter(path) as writer:
+            writer.write({'budget': [1000]})
+            raise RuntimeError("interrupted")
+    assert os.listdir(os.path.dirname(path)) == []
+
+
+def test_unexpected_column_aborts_without_partial_file(path):
+    writer = ResultWriter(path)
+    writer.write({'budget': [1000]})
+    with pytest.raises(ValueError, match='not in the schema'):
+        writer.write({'budget': [2000], 'extra': [1]})
+    with pytest.raises(ValueError, match='does not match the schema'):
+        writer.write({'budget': ['много']})
+    writer.abort()
+    assert os.listdir(os.path.dirname(path)) == []
@@ -0,0 +1,94 @@
+import itertools
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import shared_cache
+from shared_cache import EVICT_EVERY, SharedCache, cache_key
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'results.sqlite')
+
+
+def compute_in_worker(path, marker_dir):
+    # Отдельный процесс со своим соединением; файл-метка отмечает, что расчёт действительно выполнялся
+    def compute():
+        open(os.path.join(marker_dir, str(os.getpid())), 'w').close()
+        return {'values': np.arange(3)}
+    return SharedCache(path).get_or_compute('test', {'x': 1}, compute)['values'].tolist()
+
+
+def test_cache_key_canonicalizes_numbers():
+    assert cache_key('k', {'x': np.int64(1)}) == cache_key('k', {'x': 1}) == cache_key('k', {'x': 1.0})
+    assert cache_key('k', {'x': [np.float64(2.0), (3, np.int32(4))]}) == cache_key('k', {'x': [2, [3, 4]]})
+    assert cache_key('k', {'a': 1, 'b': 2}) == cache_key('k', {'b': 2, 'a': 1})
+    assert cache_key('k', {'x': 1.5}) != cache_key('k', {'x': 1})
+    assert cache_key('k', {'x': 1}) != cache_key('other', {'x': 1})
+
+
+def test_hit_and_miss(cache_path):
+    cache = SharedCache(cache_path)
+    calls = []
+    compute = lambda: calls.append(1) or 42
+    assert cache.get_or_compute('test', {'x': 1}, compute) == 42
+    assert cache.get_or_compute('test', {'x': 1.0}, compute) == 42
+    assert cache.get('test', {'x': 2}, 'absent') == 'absent'
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 2, 1)
+
+
+def test_pickle_round_trip_across_instances(cache_path):
+    value = {'guests': np.array([1, 2, 3]), 'profit': np.float64(1.5), 'tiers': [('stage1', 50)], 'name': 'Нейро'}
+    SharedCache(cache_path).put_many('test', {cache_key('test', {'x': 1}): value})
+    # Новый объект — новое соединение, как у другого воркера
+    found = SharedCache(cache_path).get('test', {'x': 1})
+    assert found['guests'].tolist() == [1, 2, 3]
+    assert found['profit'] == 1.5 and found['tiers'] == [('stage1', 50)] and found['name'] == 'Нейро'
+
+
+def test_eviction_keeps_recent_entries_within_limit(cache_path, monkeypatch):
+    # Часы по счётчику: каждая запись строго новее предыдущей
+    clock = itertools.count()
+    monkeypatch.setattr(shared_cache.time, 'time', lambda: float(next(clock)))
+    cache = SharedCache(cache_path, max_bytes=20_000)
+    keys = [cache_key('test', {'i': i}) for i in range(EVICT_EVERY)]
+    for key in keys[:-1]:
+        cache.put_many('test', {key: bytes(1000)})
+    # Вытеснение проверяется раз в EVICT_EVERY записей, до этого лимит можно превысить
+    assert cache.stats()['bytes'] > 20_000
+    cache.put_many('test', {keys[-1]: bytes(1000)})
+    stats = cache.stats()
+    assert stats['bytes'] <= 0.9 * 20_000
+    assert keys[-1] in cache.get_many([keys[-1]])
+    assert keys[0] not in cache.get_many([keys[0]])
+
+
+def test_disabled_cache_stores_nothing(cache_path):
+    cache = SharedCache(cache_path, max_bytes=0)
+    assert cache.get_or_compute('test', {'x': 1}, lambda: 42) == 42
+    assert cache.stats()['entries'] == 0
+    assert not os.path.exists(cache_path)
+
+
+def test_two_processes_share_entries(cache_path, tmp_path):
+    markers = tmp_path / 'markers'
+    markers.mkdir()
+    with multiprocessing.get_context('spawn').Pool(2) as pool:
+        results = pool.starmap(compute_in_worker, [(cache_path, str(markers))] * 2)
+    assert results == [[0, 1, 2], [0, 1, 2]]
+    # Одновременный промах может посчитать дважды, но запись остаётся одна
+    computed = len(os.listdir(markers))
+    assert 1 <= computed <= 2
+    assert SharedCache(cache_path).stats()['entries'] == 1
+    # Следующий процесс получает готовый результат без расчёта
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        assert pool.starmap(compute_in_worker, [(cache_path, str(markers))]) == [[0, 1, 2]]
+    assert len(os.listdir(markers)) == computed
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from versions import VersionStore
+
+SETTINGS = {'budget': 115000, 'marketing_percent': 0.2,
+            'tiers': [{'name': 'stage1', 'price': 500, 'limit': 50}, {'name': 'door', 'price': 1000, 'limit': 999}]}
+
+
+def test_round_trip_and_deduplication():
+    store = VersionStore()
+    assert store.commit('Neuropunk', SETTINGS) == (1, True)
+    changed = dict(SETTINGS, budget=120000)
+    assert store.commit('Neuropunk', changed) == (2, True)
+    # Порядок ключей не важен: те же настройки получают уже существующую версию
+    assert store.commit('Neuropunk', dict(reversed(list(SETTINGS.items())))) == (1, False)
+    # Снимок общий для разных имён, версии у каждого имени свои
+    assert store.commit('Hardline I', SETTINGS) == (1, True)
+    assert len(store) == 2
+    assert store.get('Neuropunk', 1) == SETTINGS and store.get('Neuropunk', 2) == changed
+    assert store.versions('Neuropunk') == [1, 2] and store.next_version('Neuropunk') == 3
+
+
+def test_returned_snapshot_is_a_copy():
+    store = VersionStore()
+    store.commit('Neuropunk', SETTINGS)
+    snapshot = store.get('Neuropunk', 1)
+    snapshot['tiers'][0]['price'] = 1
+    assert store.get('Neuropunk', 1) == SETTINGS
+
+
+def test_diff():
+    store = VersionStore()
+    store.commit('Neuropunk', SETTINGS)
+    tiers = [dict(SETTINGS['tiers'][0], price=600)]
+    store.commit('Neuropunk', dict(SETTINGS, tiers=tiers, fame_factor=2.0))
+    # Пути старой версии идут в порядке канонического JSON, новые поля — после них
+    assert store.diff('Neuropunk', 1, 2) == [
+        ('tiers[0].price', 500, 600), ('tiers[1].limit', 999, None), ('tiers[1].name', 'door', None),
+        ('tiers[1].price', 1000, None), ('fame_factor', None, 2.0),
+    ]
+
+
+@pytest.mark.parametrize('version', [0, -1, 2])
+def test_get_rejects_unknown_versions(version):
+    store = VersionStore()
+    store.commit('Neuropunk', SETTINGS)
+    with pytest.raises(KeyError):
+        store.get('Neuropunk', version)
+
+
+def test_failed_commit_leaves_store_unchanged():
+    store = VersionStore()
+    store.commit('Neuropunk', SETTINGS)
+    # Настройки, которые не сериализуются в JSON, не должны оставить пустую версию или осиротевший снимок
+    with pytest.raises(TypeError):
+        store.commit('Neuropunk', dict(SETTINGS, budget=object()))
+    assert store.latest('Neuropunk') == 1 and len(store) == 1
+    assert store.commit('Neuropunk', dict(SETTINGS, budget=1)) == (2, True)
@@ -0,0 +1,70 @@
+import hashlib
+import json
+
+
+def canonical_json(settings):
+    return json.dumps(settings, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+
+
+def _flatten(value, path=''):
+    # {'tiers': [{'price': 500}]} -> {'tiers[0].price': 500}: diff сравнивает плоские пути
+    if isinstance(value, dict):
+        items = {}
+        for key, item in value.items():
+            items.update(_flatten(item, f"{path}.{key}" if path else key))
+        return items
+    if isinstance(value, list):
+        items = {}
+        for i, item in enumerate(value):
+            items.update(_flatten(item, f"{path}[{i}]"))
+        return items
+    return {path: value}
+
+
+class VersionStore:
+    # Снимок настроек хранится один раз под SHA-256 своего канонического JSON, версия — ссылка на хэш.
+    # Для каждого базового имени ведётся список хэшей (версия n — элемент n - 1) и индекс
+    # (имя, хэш) -> версия, поэтому следующая версия, поиск дубликата и чтение версии — O(1).
+    def __init__(self):
+        self._snapshots = {}
+        self._history = {}
+        self._index = {}
+
+    def commit(self, base_name, settings):
+        # Возвращает (версия, создана ли новая): одинаковые настройки получают уже существующую версию
+        payload = canonical_json(settings)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        version = self._index.get((base_name, digest))
+        if version is not None:
+            return version, False
+        self._snapshots.setdefault(digest, payload)
+        history = self._history.setdefault(base_name, [])
+        history.append(digest)
+        self._index[(base_name, digest)] = len(history)
+        return len(history), True
+
+    def latest(self, base_name):
+        return len(self._history.get(base_name, ()))
+
+    def next_version(self, base_name):
+        return self.latest(base_name) + 1
+
+    def get(self, base_name, version):
+        # Номера версий начинаются с 1: 0 и отрицательные не должны попадать в индексацию с конца
+        history = self._history.get(base_name, ())
+        if not 1 <= version <= len(history):
+            raise KeyError(f"{base_name!r} has no version {version}")
+        digest = history[version - 1]
+        return json.loads(self._snapshots[digest])
+
+    def versions(self, base_name):
+        return list(range(1, self.latest(base_name) + 1))
+
+    def diff(self, base_name, old_version, new_version):
+        # Список (путь, старое значение, новое значение) для различающихся полей; None — поля нет
+        old, new = _flatten(self.get(base_name, old_version)), _flatten(self.get(base_name, new_version))
+        paths = list(old) + [path for path in new if path not in old]
+        return [(path, old.get(path), new.get(path)) for path in paths if old.get(path) != new.get(path)]
+
+    def __len__(self):
+        return len(self._snapshots)
@@ -0,0 +1,57 @@
+import numpy as np
+
+from forecast import K, MARKETING_EFFECTIVENESS, fame_factor_for, forecast_batch
+
+SCENARIO_FIELDS = ('budget', 'marketing_percent', 'risk_amount', 'free_tickets')
+
+
+def _scenario_key(scenario, k, marketing_effectiveness):
+    return (tuple(scenario[field] for field in SCENARIO_FIELDS),
+            tuple((tier['price'], tier['limit']) for tier in scenario['tiers']),
+            scenario.get('fame_factor'), k, marketing_effectiveness)
+
+
+class ScenarioWorkspace:
+    # Именованные сценарии считаются вместе: все изменённые с прошлого вызова results() сценарии
+    # идут одним вызовом forecast_batch (уровни дополняются до общего числа уровнями с нулевым
+    # лимитом), результаты остальных берутся из кэша по ключу входов.
+    def __init__(self):
+        self.scenarios = {}
+        self._results = {}
+
+    def set(self, name, scenario):
+        self.scenarios[name] = scenario
+
+    def remove(self, name):
+        self.scenarios.pop(name, None)
+        self._results.pop(name, None)
+
+    def results(self, k=K, marketing_effectiveness=MARKETING_EFFECTIVENESS):
+        keys = {name: _scenario_key(scenario, k, marketing_effectiveness) for name, scenario in self.scenarios.items()}
+        stale = [name for name, key in keys.items() if name not in self._results or self._results[name][0] != key]
+        if stale:
+            for name, result in zip(stale, self._forecast([self.scenarios[name] for name in stale], k, marketing_effectiveness)):
+                self._results[name] = (keys[name], result)
+        return {name: self._results[name][1] for name in self.scenarios}, stale
+
+    @staticmethod
+    def _forecast(scenarios, k, marketing_effectiveness):
+        n_tiers = max(len(scenario['tiers']) for scenario in scenarios)
+        prices = np.zeros((len(scenarios), n_tiers))
+        limits = np.zeros((len(scenarios), n_tiers), dtype=np.int64)
+        for i, scenario in enumerate(scenarios):
+            prices[i, :len(scenario['tiers'])] = [tier['price'] for tier in scenario['tiers']]
+            limits[i, :len(scenario['tiers'])] = [tier['limit'] for tier in scenario['tiers']]
+        columns = {field: np.array([scenario[field] for scenario in scenarios]) for field in SCENARIO_FIELDS}
+        fame_factor = np.array([np.nan if scenario.get('fame_factor') is None else scenario['fame_factor']
+                                for scenario in scenarios])
+        fame_factor = np.where(np.isnan(fame_factor), fame_factor_for(columns['budget'] * columns['marketing_percent']), fame_factor)
+
+        batch = forecast_batch(columns['budget'], columns['marketing_percent'], columns['risk_amount'], columns['free_tickets'],
+                               prices, limits, fame_factor, k, marketing_effectiveness)
+        results = []
+        for i, scenario in enumerate(scenarios):
+            result = {name: values[i].item() for name, values in batch.items() if name != 'tier_sales'}
+            result['tier_sales'] = batch['tier_sales'][i, :len(scenario['tiers'])].tolist()
+            results.append(result)
+        return results